@@ -15,7 +15,7 @@ pip install gunicorn  # Ensure gunicorn is installed for production
 echo "Running Migrations..."
 python backend/manage.py migrate
 
-echo "Collecting Static Files..."
+echo "Collecting Static Files (hashed + gzip/brotli precompressed)..."
 python backend/manage.py collectstatic --noinput
 
 echo "Deployment Build Completed Successfully!"
@@ -42,13 +42,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'web.middleware.RequestLogMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    'web.middleware.ApiCompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'web.middleware.RateLimitMiddleware',
+    'web.middleware.IdempotencyMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -84,6 +88,21 @@ DATABASES = {
 }
 
 
+# Caches
+# 'shared' must be visible to every worker process (file-based here; point it
+# at Redis or Memcached when running on more than one host)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache' / 'shared',
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -122,6 +141,103 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR.parent / 'dist']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# collectstatic writes content-hashed copies plus .gz/.br siblings, so WhiteNoise
+# serves precompressed files with far-future immutable cache headers
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+WHITENOISE_MANIFEST_STRICT = False
+# Manifest-hashed names (base.1a2b3c4d5e6f.css) plus Vite's own hashed bundles (assets/index-B3xk9_aZ.js)
+WHITENOISE_IMMUTABLE_FILE_TEST = r'(/assets/.+-[0-9a-zA-Z_-]{8}|\.[0-9a-f]{12})\.[^/.]+$'
+
+# Built SPA shell, served from memory by ReactAppView
+SPA_INDEX_PATH = BASE_DIR.parent / 'dist' / 'index.html'
+
+# API response settings
+API_JSON_BACKEND = 'auto'  # 'auto', 'orjson' or 'stdlib'
+API_COMPRESS_MIN_SIZE = 1024  # bytes; smaller payloads are sent uncompressed
+
+# Rate limiting: path -> {'ip' | 'account': (bucket capacity, seconds to refill)}
+RATE_LIMIT_CACHE = 'shared'
+RATE_LIMITS = {
+    '/api/login/': {'ip': (10, 60), 'account': (5, 60)},
+    '/api/register/': {'ip': (5, 300)},
+    '/api/request-blood/': {'ip': (5, 60), 'account': (5, 60)},
+}
+RATE_LIMIT_CRITICAL = (30, 60)  # separate per-IP lane for critical blood requests
+RATE_LIMIT_MAX_IN_FLIGHT = 8  # per process; beyond this non-critical writes are shed
+RATE_LIMIT_TRUST_FORWARDED = False  # set True behind a proxy that sets X-Forwarded-For
+
+# Idempotency-Key support for API writes
+IDEMPOTENCY_TTL = 24 * 60 * 60  # seconds a stored response can be replayed
+IDEMPOTENCY_LOCK_TIMEOUT = 120  # seconds before an unfinished claim (its worker likely killed) can be taken over
+IDEMPOTENCY_EVICT_PROBABILITY = 0.01  # chance per new key of sweeping expired keys
+# Auth responses carry session cookies, which a replay can't reproduce
+IDEMPOTENCY_EXEMPT_PATHS = ['/api/login/', '/api/logout/', '/api/register/']
+
+# Shared-memory inventory snapshot (a file under /dev/shm); None derives the
+# name from the database path so separate deployments never share a segment
+INVENTORY_SHM_NAME = None
+
+# Fulfilled requests and verified donations older than this are moved to the
+# archive tables by `manage.py archive_records`
+ARCHIVE_AFTER_DAYS = 365
+# Page size for /api/all-requests/?archived=1 when no ?limit= is given
+ARCHIVE_PAGE_SIZE = 50
+
+# Critical request broadcasts to compatible donors
+BROADCAST_BATCH_SIZE = 100  # messages per SMTP batch
+BROADCAST_RATE = 10  # messages per second sent to the mail relay
+BROADCAST_COOLDOWN_HOURS = 24  # don't alert the same donor more often than this
+BROADCAST_SYNC = False  # run in the request thread (tests/debugging only)
+
+# Structured logging: JSON lines written by a background thread (web.logs)
+LOG_QUEUE_SIZE = 10000  # records buffered for the writer; beyond this they're dropped, never waited on
+LOG_STREAM = 'stdout'  # 'stdout', 'stderr', a file path, or None to discard
+LOG_SLOW_REQUEST_MS = 500
+LOG_SAMPLE_RATES = {  # fraction of each INFO event kept; warnings and errors are always kept
+    'login_failed': 0.1,
+}
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'web.logs.RequestIdFilter'},
+        'sampling': {'()': 'web.logs.SamplingFilter'},
+    },
+    'handlers': {
+        'json': {
+            'class': 'web.logs.BackgroundHandler',
+            'filters': ['request_id', 'sampling'],
+        },
+    },
+    'loggers': {
+        'web': {'handlers': ['json'], 'level': 'INFO', 'propagate': False},
+        'django.request': {'handlers': ['json'], 'level': 'ERROR', 'propagate': False},
+    },
+}
+
+# Blood requests matching an earlier one's blocking key within this window are flagged as duplicates
+DEDUPE_WINDOW_HOURS = 72
+
+# Where `manage.py export_analytics` writes columnar segments for analysts
+ANALYTICS_EXPORT_DIR = BASE_DIR / 'analytics'
+
+# Stock from donations logged without a center is held here
+DEFAULT_INVENTORY_CENTER = 'Central Blood Bank'
+
+# Admin donor directory: paged responses report a total cached this long
+DONOR_COUNT_CACHE = 'shared'
+DONOR_COUNT_TTL = 60  # seconds
+
+# `manage.py test` discards the JSON logs above (LOG_STREAM=None) while the suite runs
+TEST_RUNNER = 'web.test_runner.QuietLogsRunner'
+
 # CORS and CSRF Settings
 CORS_ALLOW_ALL_ORIGINS = True
 CSRF_TRUSTED_ORIGINS = ['http://localhost:8080', 'http://127.0.0.1:8080', 'https://blood-connect-pro.netlify.app']
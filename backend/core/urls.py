@@ -4,7 +4,8 @@ from web.views import (
     ReactAppView, LoginView, RegisterView, LogoutView, UserView, GetCSRFToken, 
     RequestBloodView, GetRequestsView, AllocateDonorView, LogDonationView, 
     GetPendingDonationsView, VerifyDonationView, DonorHistoryView, 
-    UpdateEligibilityView, DashboardStatsView, GetDonorsView, GetInventoryView
+    UpdateEligibilityView, DashboardStatsView, GetDonorsView, GetInventoryView,
+    DonorSummaryView, SlaStatsView, AvailabilityView, IssueUnitsView, SlotsView, CreateSlotView, BookSlotView, CancelAppointmentView, MyAppointmentsView
 )
 
 urlpatterns = [
@@ -15,6 +16,7 @@ urlpatterns = [
     path('api/logout/', LogoutView.as_view()),
     path('api/user/', UserView.as_view()),
     path('api/get-inventory/', GetInventoryView.as_view()),
+    path('api/inventory/availability/', AvailabilityView.as_view()),
     path('api/csrf/', GetCSRFToken.as_view()),
     path('api/update-eligibility/', UpdateEligibilityView.as_view()),
 
@@ -26,12 +28,22 @@ urlpatterns = [
     # Donations
     path('api/donate/', LogDonationView.as_view()),
     path('api/my-donations/', DonorHistoryView.as_view()),
+    path('api/my-donations/summary/', DonorSummaryView.as_view()),
+
+    # Appointments
+    path('api/slots/', SlotsView.as_view()),
+    path('api/slots/book/', BookSlotView.as_view()),
+    path('api/appointments/', MyAppointmentsView.as_view()),
+    path('api/appointments/cancel/', CancelAppointmentView.as_view()),
 
     # Admin
     path('api/admin/donations/pending/', GetPendingDonationsView.as_view()),
     path('api/admin/donations/verify/', VerifyDonationView.as_view()),
     path('api/admin/stats/', DashboardStatsView.as_view()),
+    path('api/admin/sla/', SlaStatsView.as_view()),
     path('api/admin/donors/', GetDonorsView.as_view()),
+    path('api/admin/slots/', CreateSlotView.as_view()),
+    path('api/admin/inventory/issue/', IssueUnitsView.as_view()),
 
     re_path(r'^.*$', ReactAppView.as_view()),
 ]
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Appointment, DonationSlot
+
+# Outcomes of book()
+BOOKED = 'booked'
+FULL = 'full'
+CLOSED = 'closed'
+NOT_FOUND = 'not_found'
+ALREADY_BOOKED = 'already_booked'
+
+MAX_RANGE = timedelta(days=31)
+
+
+def available_slots(start, end, center=None):
+    """
+    Future slots with places left, starting in [start, end). With a center
+    this is a range scan of the (center, starts_at) unique index, otherwise
+    of (starts_at, center); the capacity test is applied to those rows only.
+    """
+    slots = DonationSlot.objects.filter(starts_at__gte=max(start, timezone.now()), starts_at__lt=end)
+    if center:
+        slots = slots.filter(center=center)
+    return slots.filter(booked__lt=F('capacity')).order_by('starts_at', 'center')
+
+
+def book(donor, slot_id):
+    """
+    Reserve a place in a slot. The capacity check and the increment are one
+    conditional UPDATE, so concurrent bookings serialise on the slot row and
+    whoever loses the race for the last place updates nothing, rather than
+    overbooking. A duplicate booking by the same donor rolls the increment
+    back. Returns (outcome, appointment).
+    """
+    try:
+        with transaction.atomic():
+            reserved = DonationSlot.objects.filter(
+                id=slot_id, booked__lt=F('capacity'), starts_at__gt=timezone.now(),
+            ).update(booked=F('booked') + 1)
+            if reserved:
+                return BOOKED, Appointment.objects.create(donor=donor, slot_id=slot_id)
+    except IntegrityError:
+        return ALREADY_BOOKED, None
+
+    slot = DonationSlot.objects.filter(id=slot_id).first()
+    if slot is None:
+        return NOT_FOUND, None
+    if slot.starts_at <= timezone.now():
+        return CLOSED, None
+    return FULL, None
+
+
+def cancel(donor, appointment_id):
+    """Give a donor's place back. Only the request that deletes the row frees the place, so double cancels are harmless."""
+    appointment = Appointment.objects.filter(id=appointment_id, donor=donor).first()
+    if appointment is None:
+        return False
+    with transaction.atomic():
+        if Appointment.objects.filter(pk=appointment.pk).delete()[0]:
+            DonationSlot.objects.filter(id=appointment.slot_id).update(booked=F('booked') - 1)
+    return True
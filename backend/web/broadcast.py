@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from . import logs
+from .models import BloodRequest, DonorNotification, DonorProfile
+
+log = logging.getLogger(__name__)
+
+# Recipient blood group -> donor groups whose red cells it can receive
+COMPATIBLE_DONORS = {
+    'O-': ('O-',),
+    'O+': ('O+', 'O-'),
+    'A-': ('A-', 'O-'),
+    'A+': ('A+', 'A-', 'O+', 'O-'),
+    'B-': ('B-', 'O-'),
+    'B+': ('B+', 'B-', 'O+', 'O-'),
+    'AB-': ('AB-', 'A-', 'B-', 'O-'),
+    'AB+': ('AB+', 'AB-', 'A+', 'A-', 'B+', 'B-', 'O+', 'O-'),
+}
+
+DONATION_INTERVAL = timedelta(days=56)
+
+
+def candidate_donors(blood_request, after_id, limit):
+    """
+    Next `limit` donors to alert, in user_id order after `after_id`. Served by
+    the (city, blood_group, is_eligible) index; the NOT EXISTS probes hit the
+    notification (donor, sent_at) index and unique constraint per row.
+    """
+    now = timezone.now()
+    cooldown = now - timedelta(hours=getattr(settings, 'BROADCAST_COOLDOWN_HOURS', 24))
+    recently_alerted = DonorNotification.objects.filter(donor=OuterRef('user_id'), sent_at__gte=cooldown)
+    already_alerted = DonorNotification.objects.filter(donor=OuterRef('user_id'), blood_request=blood_request)
+
+    return (
+        DonorProfile.objects
+        .filter(
+            city=blood_request.city,
+            blood_group__in=COMPATIBLE_DONORS.get(blood_request.blood_group, ()),
+            is_eligible=True,
+            user_id__gt=after_id,
+        )
+        .filter(Q(last_donation_date__isnull=True) | Q(last_donation_date__lte=now.date() - DONATION_INTERVAL))
+        .exclude(user__email='')
+        .filter(~Exists(recently_alerted), ~Exists(already_alerted))
+        .order_by('user_id')
+        .values_list('user_id', 'user__email', 'user__first_name')[:limit]
+    )
+
+
+def alert_message(blood_request, email, name):
+    subject = f"Urgent: {blood_request.blood_group} blood needed in {blood_request.city}"
+    message = f"""
+    Dear {name or 'Donor'},
+
+    A patient at {blood_request.hospital}, {blood_request.city} urgently needs {blood_request.blood_group} blood,
+    and your blood group is compatible.
+
+    If you are able to donate, please contact {blood_request.contact_number}.
+
+    Thank you,
+    BloodLife Team
+    """
+    return EmailMessage(subject, message, settings.DEFAULT_FROM_EMAIL, [email])
+
+
+def broadcast(request_id):
+    """
+    Alert compatible, eligible donors in the request's city. Sends in batches
+    over one SMTP connection, paced to BROADCAST_RATE messages per second.
+    Progress is recorded in DonorNotification, so re-running resumes rather
+    than re-sending. Returns the number of messages sent.
+    """
+    blood_request = BloodRequest.objects.filter(id=request_id).first()
+    if blood_request is None or blood_request.urgency != 'critical' or blood_request.status != 'PENDING':
+        return 0
+
+    batch_size = getattr(settings, 'BROADCAST_BATCH_SIZE', 100)
+    rate = getattr(settings, 'BROADCAST_RATE', 10)
+    sent, after_id = 0, 0
+
+    with get_connection() as connection:
+        while True:
+            started = time.monotonic()
+            batch = list(candidate_donors(blood_request, after_id, batch_size))
+            if not batch:
+                return sent
+
+            # Record before sending, so a crash mid-batch errs towards not re-alerting
+            donor_ids = [user_id for user_id, _, _ in batch]
+            DonorNotification.objects.bulk_create(
+                [DonorNotification(donor_id=user_id, blood_request=blood_request) for user_id in donor_ids],
+                ignore_conflicts=True,
+            )
+            try:
+                connection.send_messages([alert_message(blood_request, email, name) for _, email, name in batch])
+            except Exception:
+                # The relay refused the batch: forget it, so a resume retries these donors and the
+                # cooldown doesn't hide them from other requests. Some may be alerted twice.
+                DonorNotification.objects.filter(blood_request=blood_request, donor_id__in=donor_ids).delete()
+                raise
+            sent += len(batch)
+            after_id = batch[-1][0]
+
+            if rate:
+                time.sleep(max(0, len(batch) / rate - (time.monotonic() - started)))
+
+
+class BroadcastWorker:
+    """Background thread that runs broadcasts off the request path, one at a time."""
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, request_id):
+        if getattr(settings, 'BROADCAST_SYNC', False):
+            return broadcast(request_id)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='broadcast-worker', daemon=True)
+                self._thread.start()
+        # Carry the enqueuing request's correlation id, so the broadcast's log lines tie back to it
+        self.queue.put((request_id, logs.request_id.get()))
+
+    def _run(self):
+        while True:
+            request_id, correlation_id = self.queue.get()
+            token = logs.request_id.set(correlation_id)
+            try:
+                sent = broadcast(request_id)
+                log.info('broadcast_sent', extra={'blood_request_id': request_id, 'sent': sent})
+            except Exception:
+                # The request stays resumable via `manage.py broadcast_request`
+                log.exception('broadcast_failed', extra={'blood_request_id': request_id})
+            finally:
+                logs.request_id.reset(token)
+                connections.close_all()  # this thread's connections only
+                self.queue.task_done()
+
+
+broadcast_worker = BroadcastWorker()
@@ -0,0 +1,21 @@
+from functools import reduce
+from operator import or_
+from django.db.models import Q
+
+
+def add(model, *keys, **changes):
+    """
+    Apply `changes` (F() expressions) to the row matching each key, creating
+    missing rows with their field defaults first. The changes are applied by
+    UPDATE rather than read-modify-write, so concurrent callers never lose
+    an increment.
+    """
+    if len(keys) == 1:
+        # The row almost always exists: one UPDATE, and only create it on a miss
+        if not model.objects.filter(**keys[0]).update(**changes):
+            model.objects.get_or_create(**keys[0])
+            model.objects.filter(**keys[0]).update(**changes)
+        return
+    # Several rows: seed them with one INSERT that skips existing ones, then one UPDATE
+    model.objects.bulk_create([model(**key) for key in keys], ignore_conflicts=True)
+    model.objects.filter(reduce(or_, (Q(**key) for key in keys))).update(**changes)
@@ -0,0 +1,56 @@
+import hashlib
+import re
+import unicodedata
+from datetime import timedelta
+from django.conf import settings
+from .models import BloodRequest
+
+# Dropped from patient names so "Mr. R. Sharma" and "r sharma" block together
+TITLES = {'mr', 'mrs', 'ms', 'miss', 'dr', 'shri', 'smt', 'kumari', 'baby', 'master', 'late'}
+
+
+def window():
+    return timedelta(hours=getattr(settings, 'DEDUPE_WINDOW_HOURS', 72))
+
+
+def normalize(text):
+    """Casefold, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+
+
+def normalize_name(name):
+    return ' '.join(word for word in normalize(name).split() if word not in TITLES)
+
+
+def normalize_phone(number):
+    # Last 10 digits, so +91 / 0 prefixes and spacing don't matter
+    return re.sub(r'\D', '', number or '')[-10:]
+
+
+def blocking_key(patient_name, hospital, blood_group, contact_number):
+    """
+    Requests for the same patient share this key. Candidates are found by
+    an equality lookup on the (dedupe_key, created_at) index rather than by
+    comparing against every open request.
+    """
+    parts = (normalize_name(patient_name), normalize(hospital), (blood_group or '').strip().upper(),
+             normalize_phone(contact_number))
+    return hashlib.sha1('\0'.join(parts).encode('utf-8')).hexdigest()
+
+
+def key_for(blood_request):
+    return blocking_key(blood_request.patient_name, blood_request.hospital, blood_request.blood_group,
+                        blood_request.contact_number)
+
+
+def find_original(key, created_at):
+    """The earliest non-duplicate request with `key` created within the window before `created_at`."""
+    return (
+        BloodRequest.objects
+        .filter(dedupe_key=key, created_at__gte=created_at - window(), created_at__lte=created_at,
+                duplicate_of__isnull=True)
+        .order_by('created_at', 'id')
+        .first()
+    )
@@ -0,0 +1,88 @@
+import hashlib
+from datetime import datetime, time, timedelta
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+FILTERS = ('blood_group', 'city', 'eligible', 'registered_from', 'registered_to')
+
+# ?sort= -> ORDER BY; each is served by a (filter, registered_at) index or by (registered_at, id)
+ORDERINGS = {
+    '-registered_at': ('-registered_at', '-id'),
+    'registered_at': ('registered_at', 'id'),
+}
+
+
+def parse_moment(value, end_of_day=False):
+    """An ISO date or datetime. A bare date means the start of that day, or the start of the next one for `end_of_day`."""
+    try:
+        # Both raise ValueError, with Python's wording, for well-formed but impossible dates like 2024-13-01
+        day = parse_date(value)
+        moment = None if day is not None else parse_datetime(value)
+    except ValueError:
+        day = moment = None
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end_of_day else day, time.min)
+    elif moment is None:
+        raise ValueError(f'Invalid date: {value}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_donors(queryset, params):
+    """Apply the directory's ?blood_group=, ?city=, ?eligible= and ?registered_from/_to= filters."""
+    if params.get('blood_group'):
+        queryset = queryset.filter(blood_group=params['blood_group'])
+    if params.get('city'):
+        queryset = queryset.filter(city=params['city'])
+    if params.get('eligible'):
+        eligible = params['eligible'].lower()
+        if eligible not in ('1', 'true', 'yes', '0', 'false', 'no'):
+            raise ValueError('eligible must be true or false')
+        queryset = queryset.filter(is_eligible=eligible in ('1', 'true', 'yes'))
+    if params.get('registered_from'):
+        queryset = queryset.filter(registered_at__gte=parse_moment(params['registered_from']))
+    if params.get('registered_to'):
+        # A bare date is inclusive of the whole day
+        queryset = queryset.filter(registered_at__lt=parse_moment(params['registered_to'], end_of_day=True))
+    return queryset
+
+
+def sort_key(params):
+    sort = params.get('sort') or '-registered_at'
+    if sort not in ORDERINGS:
+        raise ValueError(f"sort must be one of {', '.join(ORDERINGS)}")
+    return sort
+
+
+def cursor_for(profile):
+    # Cursor is "<registered_at iso>|<id>" of the last row on the previous page
+    return f'{profile.registered_at.isoformat()}|{profile.id}'
+
+
+def after_cursor(cursor, sort):
+    moment, _, last_id = cursor.rpartition('|')
+    moment, last_id = datetime.fromisoformat(moment), int(last_id)
+    if sort.startswith('-'):
+        return Q(registered_at__lt=moment) | Q(registered_at=moment, id__lt=last_id)
+    return Q(registered_at__gt=moment) | Q(registered_at=moment, id__gt=last_id)
+
+
+def cached_count(queryset, params):
+    """
+    Total rows matching the filters, cached for DONOR_COUNT_TTL seconds so
+    paging through the directory doesn't run a COUNT(*) per page. The total
+    may lag new registrations by up to the TTL.
+    """
+    filters = urlencode(sorted((k, params[k]) for k in FILTERS if params.get(k)))
+    key = 'donor_count:' + hashlib.sha1(filters.encode('utf-8')).hexdigest()
+    cache = caches[getattr(settings, 'DONOR_COUNT_CACHE', 'default')]
+    total = cache.get(key)
+    if total is None:
+        total = queryset.count()
+        cache.set(key, total, getattr(settings, 'DONOR_COUNT_TTL', 60))
+    return total
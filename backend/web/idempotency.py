@@ -0,0 +1,98 @@
+import hashlib
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import IdempotencyKey
+from .ratelimit import client_ip
+
+# Outcomes of claim()
+CLAIMED = 'claimed'
+REPLAY = 'replay'
+IN_PROGRESS = 'in_progress'
+MISMATCH = 'mismatch'
+
+
+def ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_TTL', 24 * 60 * 60))
+
+
+def lock_timeout():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 120))
+
+
+def digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def scoped_key(request, client_key):
+    """Keys are namespaced by caller and path so two clients can't collide or read each other's responses."""
+    user = getattr(request, 'user', None)
+    scope = f'user:{user.pk}' if user is not None and user.is_authenticated else f'ip:{client_ip(request)}'
+    return digest(scope, request.path, client_key)
+
+
+def evict_expired():
+    IdempotencyKey.objects.filter(created_at__lt=timezone.now() - ttl()).delete()
+
+
+def claim(key, fingerprint):
+    """
+    Atomically reserve `key` for this request. The unique constraint on
+    IdempotencyKey.key makes concurrent duplicates race on a single INSERT:
+    exactly one caller gets CLAIMED, the rest see the existing row.
+    An in-progress claim older than IDEMPOTENCY_LOCK_TIMEOUT belongs to a
+    worker that died before complete() or release() ran, and a retry takes
+    it over. Returns (outcome, row).
+    """
+    if random.random() < getattr(settings, 'IDEMPOTENCY_EVICT_PROBABILITY', 0.01):
+        evict_expired()
+
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                return CLAIMED, IdempotencyKey.objects.create(key=key, fingerprint=fingerprint)
+        except IntegrityError:
+            pass
+
+        existing = IdempotencyKey.objects.filter(key=key).first()
+        if existing is None:
+            continue  # released between our INSERT and SELECT, try again
+        if existing.created_at < timezone.now() - ttl():
+            IdempotencyKey.objects.filter(pk=existing.pk).delete()
+            continue
+        if existing.fingerprint != fingerprint:
+            return MISMATCH, existing
+        if existing.status_code is None:
+            now = timezone.now()
+            if existing.created_at >= now - lock_timeout():
+                return IN_PROGRESS, existing
+            # Conditional on the stale claim, so of several retries exactly one takes over
+            if IdempotencyKey.objects.filter(pk=existing.pk, status_code__isnull=True,
+                                             created_at=existing.created_at).update(created_at=now):
+                existing.created_at = now
+                return CLAIMED, existing
+            continue
+        return REPLAY, existing
+
+    return IN_PROGRESS, None
+
+
+def _ours(row):
+    # A worker whose claim was taken over after the lease ran out no longer owns the row
+    return IdempotencyKey.objects.filter(pk=row.pk, created_at=row.created_at, status_code__isnull=True)
+
+
+def complete(row, response):
+    _ours(row).update(status_code=response.status_code, content_type=response.get('Content-Type', ''),
+                      body=response.content)
+
+
+def release(row):
+    """Forget a claim whose request failed server-side, so the client's retry runs again."""
+    _ours(row).delete()
@@ -0,0 +1,76 @@
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from . import counters
+from .broadcast import COMPATIBLE_DONORS
+from .models import CenterInventory, Inventory
+from .snapshot import inventory_snapshot
+
+
+def center_name(center):
+    # Donations logged without a center count towards the default one
+    return (center or '').strip() or getattr(settings, 'DEFAULT_INVENTORY_CENTER', 'Central Blood Bank')
+
+
+def _add(model, units, **key):
+    counters.add(model, key, units_available=F('units_available') + units, last_updated=timezone.now())
+
+
+def receive(center, blood_group, units):
+    """
+    Add units to a center's stock and to the global rollup in one
+    transaction. Queryset updates skip the Inventory signal, so the
+    snapshot is republished here once the change commits.
+    """
+    units = Decimal(str(units))
+    with transaction.atomic():
+        _add(CenterInventory, units, center=center_name(center), blood_group=blood_group)
+        _add(Inventory, units, blood_group=blood_group)
+        transaction.on_commit(inventory_snapshot.refresh)
+
+
+def issue(center, blood_group, units):
+    """
+    Take units out of a center's stock. The stock check and the decrement
+    are one conditional UPDATE, so two concurrent issues can't both spend
+    the same units. Returns False, changing nothing, if the center is short.
+    """
+    units = Decimal(str(units))
+    with transaction.atomic():
+        taken = CenterInventory.objects.filter(
+            center=center_name(center), blood_group=blood_group, units_available__gte=units,
+        ).update(units_available=F('units_available') - units, last_updated=timezone.now())
+        if not taken:
+            return False
+        _add(Inventory, -units, blood_group=blood_group)
+        transaction.on_commit(inventory_snapshot.refresh)
+    return True
+
+
+def suppliers(blood_group, units):
+    """
+    Centers holding at least `units` of blood a `blood_group` recipient can
+    take, best first: centers with enough of the exact group, then by total
+    compatible stock. Reads one row per (center, compatible group) with
+    stock, via the (blood_group, units_available) index, so the cost
+    follows the number of centers rather than the donation history.
+    """
+    compatible = COMPATIBLE_DONORS.get(blood_group, ())
+    rows = (
+        CenterInventory.objects
+        .filter(blood_group__in=compatible, units_available__gt=0)
+        .values_list('center', 'blood_group', 'units_available')
+    )
+    centers = {}
+    for center, group, available in rows:
+        centers.setdefault(center, {})[group] = float(available)
+
+    units = float(units)
+    found = [
+        {'center': center, 'total_units': sum(stock.values()), 'units': stock}
+        for center, stock in centers.items() if sum(stock.values()) >= units
+    ]
+    found.sort(key=lambda c: (c['units'].get(blood_group, 0) < units, -c['total_units'], c['center']))
+    return found
@@ -0,0 +1,121 @@
+import math
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from . import counters
+from .models import BloodRequest, LatencyBucket, RequestStatusChange
+
+STATUSES = {code for code, _ in BloodRequest.STATUS_CHOICES}
+# Reaching any of these means a donor has been found; the dashboard calls it APPROVED
+ALLOCATED = {'APPROVED', 'ALLOCATED', 'FULFILLED'}
+# Nothing moves a request out of these
+TERMINAL = {'REJECTED'}
+METRICS = ('allocate', 'fulfil')
+DIMENSIONS = ('all', 'urgency', 'city', 'blood_group')
+PERCENTILES = (50, 90, 99)
+
+# Log-scaled histogram buckets: bucket 0 is under a minute, then each bucket
+# is 2^(1/4) times wider, so a percentile is off by at most ~9%. The last
+# bucket takes everything past ~3 years.
+BASE_SECONDS = 60
+RATIO = 2 ** 0.25
+MAX_BUCKET = 84
+
+
+def bucket_for(seconds):
+    if seconds < BASE_SECONDS:
+        return 0
+    return min(MAX_BUCKET, 1 + int(math.log(seconds / BASE_SECONDS, RATIO)))
+
+
+def bucket_seconds(bucket):
+    """Representative wait for a bucket: the geometric middle of its span."""
+    if bucket == 0:
+        return BASE_SECONDS / 2
+    return BASE_SECONDS * RATIO ** (bucket - 1) * math.sqrt(RATIO)
+
+
+def _observe(metric, blood_request, seconds):
+    bucket = bucket_for(seconds)
+    keys = [
+        {'metric': metric, 'dimension': dimension, 'bucket': bucket,
+         'value': 'all' if dimension == 'all' else getattr(blood_request, dimension) or ''}
+        for dimension in DIMENSIONS
+    ]
+    counters.add(LatencyBucket, *keys, count=F('count') + 1)
+
+
+def transition(blood_request, status, by=None):
+    """
+    Move a request to `status`, recording the change in its history. The
+    first time it is allocated or fulfilled, the wait since it was created
+    is stamped on the request and added to the SLA histograms. Fulfilling a
+    request that was never allocated counts as both; rejecting one records
+    no wait. Returns False if the request was already in `status`, is
+    closed, or changed under us.
+    """
+    if status not in STATUSES:
+        raise ValueError(f'Unknown status: {status}')
+    previous = blood_request.status
+    if status == previous or previous in TERMINAL:
+        return False
+
+    now = timezone.now()
+    changes = {'status': status}
+    if status in ALLOCATED and blood_request.allocated_at is None:
+        changes['allocated_at'] = now
+    if status == 'FULFILLED' and blood_request.fulfilled_at is None:
+        changes['fulfilled_at'] = now
+
+    with transaction.atomic():
+        # Conditional on the status we read, so a concurrent change is recorded once
+        if not BloodRequest.objects.filter(pk=blood_request.pk, status=previous).update(**changes):
+            return False
+        RequestStatusChange.objects.create(
+            blood_request=blood_request, from_status=previous, to_status=status, changed_at=now,
+            changed_by=by if by is not None and by.is_authenticated else None,
+        )
+        waited = (now - blood_request.created_at).total_seconds()
+        if 'allocated_at' in changes:
+            _observe('allocate', blood_request, waited)
+        if 'fulfilled_at' in changes:
+            _observe('fulfil', blood_request, waited)
+
+    for field, value in changes.items():
+        setattr(blood_request, field, value)
+    return True
+
+
+def percentile(histogram, total, p):
+    rank = math.ceil(total * p / 100)
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return round(bucket_seconds(bucket), 1)
+    return None
+
+
+def sla(dimension='all'):
+    """
+    {value: {metric: {'count', 'p50', 'p90', 'p99'}}} with waits in seconds,
+    read from the histograms, so the cost follows the number of groups and
+    buckets rather than the request history.
+    """
+    if dimension not in DIMENSIONS:
+        raise ValueError(f'Unknown dimension: {dimension}')
+    histograms = {}
+    rows = LatencyBucket.objects.filter(dimension=dimension).values_list('metric', 'value', 'bucket', 'count')
+    for metric, value, bucket, count in rows:
+        histograms.setdefault(value, {}).setdefault(metric, {})[bucket] = count
+
+    result = {}
+    for value, metrics in histograms.items():
+        result[value] = {}
+        for metric in METRICS:
+            histogram = metrics.get(metric, {})
+            total = sum(histogram.values())
+            result[value][metric] = {'count': total, **{
+                f'p{p}': percentile(histogram, total, p) if total else None for p in PERCENTILES
+            }}
+    return result
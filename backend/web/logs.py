@@ -0,0 +1,149 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from django.conf import settings
+
+# Correlation id of the request (or background job) the current thread is working on
+request_id = contextvars.ContextVar('request_id', default=None)
+
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# LogRecord attributes that aren't user-supplied `extra` fields
+RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+def new_request_id(incoming=None):
+    """Reuse a well-formed X-Request-ID from the proxy or client, else mint one."""
+    if incoming and VALID_REQUEST_ID.match(incoming):
+        return incoming
+    return uuid.uuid4().hex
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the correlation id. Handler filters run in the thread that logs, where it is set."""
+
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep a LOG_SAMPLE_RATES[event] fraction of each event, where the event
+    is the record's message. Warnings and errors are always kept.
+    """
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = getattr(settings, 'LOG_SAMPLE_RATES', {}).get(record.msg, 1.0)
+        if rate < 1.0:
+            record.sample_rate = rate
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, event, request_id, then any `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        entry.update((k, v) for k, v in vars(record).items() if k not in RESERVED and k not in entry)
+        if record.exc_text or record.exc_info:
+            entry['exc'] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Wait for room rather than failing when stopping behind a full queue
+        self.queue.put(self._sentinel)
+
+
+class BackgroundHandler(QueueHandler):
+    """
+    Hands records to a bounded queue; a listener thread formats them as JSON
+    and writes them out. The request thread never touches the stream, and if
+    the writer falls behind, records are dropped and counted rather than
+    blocking the request.
+    """
+
+    def __init__(self, stream=None, maxsize=None):
+        self.maxsize = maxsize if maxsize is not None else getattr(settings, 'LOG_QUEUE_SIZE', 10000)
+        super().__init__(queue.Queue(self.maxsize))
+        self.target = self._target(stream)
+        self.target.setFormatter(JsonFormatter())
+        self.dropped = 0
+        self.listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.stop)  # flushes what's queued on shutdown
+
+    @staticmethod
+    def _target(stream):
+        # An explicit stream wins; otherwise LOG_STREAM is 'stdout', 'stderr', a file path, or None to discard
+        if stream is not None:
+            return logging.StreamHandler(stream)
+        destination = getattr(settings, 'LOG_STREAM', 'stdout')
+        if destination is None:
+            return logging.NullHandler()
+        if destination in ('stdout', 'stderr'):
+            return logging.StreamHandler(getattr(sys, destination))
+        return logging.FileHandler(destination, delay=True)
+
+    def _ensure_listener(self):
+        # Threads don't survive fork(), so a pre-forked worker starts its own writer
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                if self._pid is not None:
+                    self.queue = queue.Queue(self.maxsize)
+                self.listener = _Listener(self.queue, self.target, respect_handler_level=True)
+                self.listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Only make the record safe to hand across threads; JSON encoding happens on the listener
+        record = logging.makeLogRecord(vars(record))
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Write out everything queued so far and stop the writer thread."""
+        with self._lock:
+            if self.listener is not None and self._pid == os.getpid():
+                self.listener.stop()
+            self.listener, self._pid = None, None
+
+    def close(self):
+        self.stop()
+        self.target.close()
+        super().close()
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from web.models import ArchivedBloodRequest, ArchivedDonation, BloodRequest, Donation
+
+REQUEST_FIELDS = [
+    'id', 'patient_name', 'blood_group', 'hospital', 'city', 'contact_number', 'requester_email',
+    'urgency', 'additional_notes', 'status', 'assigned_donor_id', 'created_at', 'allocated_at', 'fulfilled_at',
+    'dedupe_key', 'duplicate_of_id',
+]
+DONATION_FIELDS = [
+    'id', 'donor_id', 'units', 'blood_group', 'center', 'donation_date', 'is_verified',
+    'verified_at', 'verified_by_id',
+]
+
+
+class Command(BaseCommand):
+    help = 'Move fulfilled requests and verified donations older than --days into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'ARCHIVE_AFTER_DAYS', 365))
+        parser.add_argument('--chunk-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        chunk_size = options['chunk_size']
+
+        requests = BloodRequest.objects.filter(status='FULFILLED', created_at__lt=cutoff)
+        donations = Donation.objects.filter(is_verified=True, donation_date__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'Would archive {requests.count()} requests and {donations.count()} donations')
+            return
+
+        moved_requests = self.move(requests, ArchivedBloodRequest, REQUEST_FIELDS, chunk_size)
+        moved_donations = self.move(donations, ArchivedDonation, DONATION_FIELDS, chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved_requests} requests and {moved_donations} donations older than {cutoff:%Y-%m-%d}'
+        ))
+
+    def move(self, queryset, archive_model, fields, chunk_size):
+        """
+        Copy then delete in short transactions of `chunk_size` rows, walking
+        the primary key so each chunk is an index range scan and the writer
+        lock is never held for the whole backlog.
+        """
+        moved, last_id = 0, 0
+        while True:
+            with transaction.atomic():
+                rows = list(queryset.filter(id__gt=last_id).order_by('id').values(*fields)[:chunk_size])
+                if not rows:
+                    return moved
+                ids = [row['id'] for row in rows]
+                archive_model.objects.bulk_create([archive_model(**row) for row in rows], ignore_conflicts=True)
+                queryset.model.objects.filter(id__in=ids).delete()
+            moved += len(rows)
+            last_id = ids[-1]
@@ -0,0 +1,56 @@
+import gzip
+import time
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from web.responses import JSON_BACKENDS, sparse
+from web.middleware import brotli
+
+
+class Command(BaseCommand):
+    help = 'Benchmark API serialization: CPU time per backend and bytes on the wire'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--fields', default='id,patient_name,blood_group,location,status',
+                            help='Sparse fieldset to compare against the full payload')
+
+    def handle(self, *args, **options):
+        rows = self.sample_rows(options['rows'])
+        fields = set(options['fields'].split(','))
+        payloads = {'full': rows, 'sparse': sparse(rows, fields)}
+
+        self.stdout.write(f"{options['rows']} rows x {options['iterations']} iterations\n")
+        self.stdout.write('CPU time per encode:')
+        for name, dumps in JSON_BACKENDS.items():
+            for label, payload in payloads.items():
+                start = time.process_time()
+                for _ in range(options['iterations']):
+                    dumps(payload)
+                elapsed = (time.process_time() - start) / options['iterations']
+                self.stdout.write(f'  {name:<8} {label:<7} {elapsed * 1000:8.2f} ms')
+
+        self.stdout.write('\nBytes on the wire:')
+        dumps = JSON_BACKENDS['stdlib']
+        for label, payload in payloads.items():
+            body = dumps(payload)
+            line = f'  {label:<7} raw={len(body):>9} gzip={len(gzip.compress(body)):>8}'
+            if brotli is not None:
+                line += f' br={len(brotli.compress(body, quality=4)):>8}'
+            self.stdout.write(line)
+
+    def sample_rows(self, count):
+        now = timezone.now()
+        return [{
+            'id': i,
+            'patient_name': f'Patient {i}',
+            'blood_group': ('A+', 'B+', 'O+', 'AB+', 'A-', 'B-', 'O-', 'AB-')[i % 8],
+            'location': 'Hyderabad',
+            'status': 'pending',
+            'created_at': now.isoformat(),
+            'assigned_donor_id': None,
+            'units': 1,
+            'reason': 'Scheduled surgery, requires compatible units within 48 hours.',
+            'requester_email': f'family{i}@example.com',
+            'requester_id': 'guest',
+        } for i in range(count)]
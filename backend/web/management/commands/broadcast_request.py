@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from web.broadcast import broadcast
+
+
+class Command(BaseCommand):
+    help = 'Send (or resume) the donor broadcast for a critical blood request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('request_id', type=int)
+
+    def handle(self, *args, **options):
+        sent = broadcast(options['request_id'])
+        self.stdout.write(self.style.SUCCESS(f'Alerted {sent} donors'))
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from web import dedupe
+from web.models import BloodRequest
+
+
+class Command(BaseCommand):
+    help = 'Compute blocking keys for older blood requests and flag likely duplicates in the backlog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        keyed = self.backfill_keys(options['chunk_size'])
+        flagged = self.flag_duplicates(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Keyed {keyed} requests and flagged {flagged} duplicates'))
+
+    def backfill_keys(self, chunk_size):
+        """Requests created before duplicate detection have no key yet."""
+        keyed, last_id = 0, 0
+        while True:
+            rows = list(BloodRequest.objects.filter(dedupe_key='', id__gt=last_id).order_by('id')[:chunk_size])
+            if not rows:
+                return keyed
+            for r in rows:
+                r.dedupe_key = dedupe.key_for(r)
+            BloodRequest.objects.bulk_update(rows, ['dedupe_key'])
+            keyed += len(rows)
+            last_id = rows[-1].id
+
+    def flag_duplicates(self, chunk_size):
+        """
+        One pass over the (dedupe_key, created_at) index. Within a key, the
+        first request is the original, and later ones within the window of it
+        are flagged; a request past the window starts a new original. Rows
+        already flagged are left alone. Comparisons never leave a key group,
+        so the work is linear in the backlog.
+        """
+        window = dedupe.window()
+        flagged, last, key, original = 0, None, None, None
+        rows = BloodRequest.objects.exclude(dedupe_key='').only('id', 'dedupe_key', 'created_at', 'duplicate_of')
+        while True:
+            page = rows
+            if last is not None:
+                k, c, i = last
+                page = page.filter(Q(dedupe_key__gt=k) | Q(dedupe_key=k, created_at__gt=c)
+                                   | Q(dedupe_key=k, created_at=c, id__gt=i))
+            chunk = list(page.order_by('dedupe_key', 'created_at', 'id')[:chunk_size])
+            if not chunk:
+                return flagged
+
+            duplicates = []
+            for r in chunk:
+                if r.dedupe_key != key:
+                    key, original = r.dedupe_key, None
+                if r.duplicate_of_id is not None:
+                    continue
+                if original is not None and r.created_at - original.created_at <= window:
+                    r.duplicate_of_id = original.id
+                    duplicates.append(r)
+                else:
+                    original = r
+            if duplicates:
+                BloodRequest.objects.bulk_update(duplicates, ['duplicate_of'])
+            flagged += len(duplicates)
+            last = (chunk[-1].dedupe_key, chunk[-1].created_at, chunk[-1].id)
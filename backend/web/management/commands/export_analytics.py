@@ -0,0 +1,218 @@
+import json
+import os
+import shutil
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+from web.models import ArchivedBloodRequest, ArchivedDonation, BloodRequest, Donation, DonorProfile
+
+try:
+    import numpy as np
+except ImportError:  # only this command needs numpy
+    np = None
+
+MANIFEST_VERSION = 2  # 2: donors are walked by created_at rather than registered_at
+
+# Each table is exported in windows of its cursor column, which must be set to (about) the current time
+# when the row is inserted, or for donations when it is verified, and never change afterwards. A row
+# whose cursor starts out in the past lands behind `exported_until` and is never exported; one whose
+# cursor is NULL is skipped, and counted in the command's output. `dict:<name>` columns are stored as integer codes into
+# manifest['dictionaries'][<name>], shared by every segment. `mutable` columns hold the value at
+# export time; `--rebuild` refreshes them.
+TABLES = {
+    'donations': {
+        'models': (Donation, ArchivedDonation),
+        'filter': Q(is_verified=True),
+        'cursor': 'verified_at',
+        'columns': {
+            'id': 'int64',
+            'donor_id': 'int64',
+            'units': 'float32',
+            'blood_group': 'dict:blood_group',
+            'center': 'dict:center',
+            'donation_date': 'datetime64[us]',
+            'verified_at': 'datetime64[us]',
+        },
+        'mutable': [],
+    },
+    'requests': {
+        'models': (BloodRequest, ArchivedBloodRequest),
+        'filter': Q(),
+        'cursor': 'created_at',
+        'columns': {
+            'id': 'int64',
+            'blood_group': 'dict:blood_group',
+            'city': 'dict:city',
+            'hospital': 'dict:hospital',
+            'urgency': 'dict:urgency',
+            'status': 'dict:status',
+            'created_at': 'datetime64[us]',
+        },
+        'mutable': ['status'],
+    },
+    'donors': {
+        'models': (DonorProfile,),
+        'filter': Q(),
+        'cursor': 'created_at',
+        'columns': {
+            'user_id': 'int64',
+            'blood_group': 'dict:blood_group',
+            'city': 'dict:city',
+            'is_eligible': 'bool',
+            'last_donation_date': 'datetime64[D]',
+            'registered_at': 'datetime64[us]',
+        },
+        'mutable': ['blood_group', 'city', 'is_eligible', 'last_donation_date'],
+    },
+}
+
+
+def utc_naive(value):
+    # numpy datetimes carry no timezone; store UTC
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class Command(BaseCommand):
+    help = (
+        'Append donations, requests and donor profiles added since the last run to columnar '
+        'NumPy segments under --out, described by manifest.json. Load columns with '
+        'numpy.load(path, mmap_mode="r").'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--out', default=getattr(settings, 'ANALYTICS_EXPORT_DIR', None))
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--segment-rows', type=int, default=1_000_000)
+        parser.add_argument('--lag-minutes', type=int, default=5,
+                            help='Leave out rows newer than this, whose transactions may still be committing')
+        parser.add_argument('--rebuild', action='store_true', help='Discard the export and start again')
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('export_analytics needs numpy: pip install numpy')
+        if not options['out']:
+            raise CommandError('Set ANALYTICS_EXPORT_DIR or pass --out')
+
+        self.root = Path(options['out'])
+        self.chunk_size = options['chunk_size']
+        self.segment_rows = options['segment_rows']
+        if options['rebuild']:
+            for table in TABLES:
+                shutil.rmtree(self.root / table, ignore_errors=True)
+            (self.root / 'manifest.json').unlink(missing_ok=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        self.manifest = self.load_manifest()
+        self.codes = {name: {v: i for i, v in enumerate(entries)}
+                      for name, entries in self.manifest['dictionaries'].items()}
+        end = timezone.now() - timedelta(minutes=options['lag_minutes'])
+
+        for table, spec in TABLES.items():
+            exported = self.export(table, spec, end)
+            self.stdout.write(f'{table}: {exported} rows')
+            missing = sum(model.objects.filter(spec['filter'], **{f"{spec['cursor']}__isnull": True}).count()
+                          for model in spec['models'])
+            if missing:
+                self.stderr.write(f"{table}: {missing} rows have no {spec['cursor']} and were not exported")
+        self.stdout.write(self.style.SUCCESS(f'Exported up to {end:%Y-%m-%d %H:%M} into {self.root}'))
+
+    def load_manifest(self):
+        try:
+            manifest = json.loads((self.root / 'manifest.json').read_text())
+        except FileNotFoundError:
+            manifest = {'version': MANIFEST_VERSION, 'dictionaries': {}, 'tables': {}}
+        if manifest['version'] != MANIFEST_VERSION:
+            raise CommandError(f"Export format {manifest['version']} is not {MANIFEST_VERSION}; use --rebuild")
+        return manifest
+
+    def save_manifest(self):
+        # Segments are in place before the manifest names them, so readers never see a partial export
+        tmp = self.root / 'manifest.json.tmp'
+        tmp.write_text(json.dumps(self.manifest, indent=2))
+        os.replace(tmp, self.root / 'manifest.json')
+
+    def export(self, table, spec, end):
+        state = self.manifest['tables'].setdefault(table, {
+            'cursor_column': spec['cursor'], 'columns': spec['columns'], 'mutable': spec['mutable'],
+            'exported_until': None, 'rows': 0, 'segments': [],
+        })
+        start = datetime.fromisoformat(state['exported_until']) if state['exported_until'] else None
+        if start is not None and end <= start:
+            return 0  # run again within --lag-minutes of the last one; never move the window back
+
+        buffer, exported = [], 0
+        for row in self.rows(spec, start, end):
+            buffer.append(row)
+            if len(buffer) >= self.segment_rows:
+                exported += self.write_segment(table, spec, state, buffer)
+                buffer = []
+        if buffer:
+            exported += self.write_segment(table, spec, state, buffer)
+
+        state['exported_until'] = end.isoformat()
+        self.save_manifest()
+        return exported
+
+    def rows(self, spec, start, end):
+        """
+        Walk each model in (cursor, id) order, one short query per chunk, so
+        the read lock on the live database is never held for the whole
+        export. Archive tables only hold rows older than any incremental
+        window, so they are read on the first export only.
+        """
+        fields = list(spec['columns'])
+        cursor = spec['cursor']
+        models = spec['models'] if start is None else spec['models'][:1]
+        for model in models:
+            queryset = model.objects.filter(spec['filter'], **{f'{cursor}__lt': end})
+            if start is not None:
+                queryset = queryset.filter(**{f'{cursor}__gte': start})
+            last = None
+            while True:
+                page = queryset
+                if last is not None:
+                    page = page.filter(Q(**{f'{cursor}__gt': last[0]}) | Q(**{cursor: last[0], 'id__gt': last[1]}))
+                chunk = list(page.order_by(cursor, 'id').values_list(cursor, 'id', *fields)[:self.chunk_size])
+                if not chunk:
+                    break
+                for row in chunk:
+                    yield row[2:]
+                last = chunk[-1][:2]
+
+    def encode(self, kind, values):
+        if kind.startswith('dict:'):
+            name = kind[len('dict:'):]
+            entries = self.manifest['dictionaries'].setdefault(name, [])
+            codes = self.codes.setdefault(name, {})
+            for value in values:
+                if (value or '') not in codes:
+                    codes[value or ''] = len(entries)
+                    entries.append(value or '')
+            dtype = 'uint8' if len(entries) <= 1 << 8 else 'uint16' if len(entries) <= 1 << 16 else 'uint32'
+            return np.fromiter((codes[v or ''] for v in values), dtype=dtype, count=len(values))
+        if kind.startswith('datetime64'):
+            return np.array([utc_naive(v) for v in values], dtype=kind)
+        if kind.startswith('float'):
+            return np.array([float(v) for v in values], dtype=kind)
+        return np.array(values, dtype=kind)
+
+    def write_segment(self, table, spec, state, rows):
+        name = f"{table}/{len(state['segments']) + 1:06d}"
+        final, tmp = self.root / name, self.root / f'{name}.tmp'
+        # Leftovers from a run that died before updating the manifest
+        shutil.rmtree(tmp, ignore_errors=True)
+        shutil.rmtree(final, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        for column, values in zip(spec['columns'], zip(*rows)):
+            np.save(tmp / f'{column}.npy', self.encode(spec['columns'][column], list(values)))
+        os.replace(tmp, final)
+
+        state['segments'].append({'path': name, 'rows': len(rows)})
+        state['rows'] += len(rows)
+        return len(rows)
@@ -0,0 +1,190 @@
+import logging
+import time
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from . import idempotency, logs
+from .ratelimit import account_key, client_ip, in_flight, is_critical, request_json, take_token
+from .responses import FastJsonResponse, choose_encoding
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+log = logging.getLogger(__name__)
+
+
+class RequestLogMiddleware:
+    """
+    Give each request a correlation id, taken from a well-formed X-Request-ID
+    header or minted here. Every log record written while handling the
+    request carries it, and it is echoed on the response. Requests slower
+    than LOG_SLOW_REQUEST_MS are logged as `slow_request`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'LOG_SLOW_REQUEST_MS', 500)
+
+    def __call__(self, request):
+        correlation_id = logs.new_request_id(request.headers.get('X-Request-ID'))
+        token = logs.request_id.set(correlation_id)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= self.slow_ms:
+                log.info('slow_request', extra={
+                    'method': request.method, 'path': request.path,
+                    'status': response.status_code, 'duration_ms': round(elapsed_ms, 1),
+                })
+            response['X-Request-ID'] = correlation_id
+            return response
+        finally:
+            logs.request_id.reset(token)
+
+
+class ApiCompressionMiddleware:
+    """
+    Compress /api/ responses larger than API_COMPRESS_MIN_SIZE bytes.
+    Prefers brotli when the client accepts it and the module is installed,
+    otherwise falls back to gzip.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'API_COMPRESS_MIN_SIZE', 1024)
+        self.prefix = getattr(settings, 'API_PREFIX', '/api/')
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if not request.path.startswith(self.prefix):
+            return response
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        offered = ('br', 'gzip') if brotli is not None else ('gzip',)
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), offered)
+
+        if encoding == 'br':
+            compressed = brotli.compress(response.content, quality=4)
+        elif encoding == 'gzip':
+            compressed = compress_string(response.content)
+        else:
+            return response
+
+        # Skip when compression doesn't actually save anything
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        return response
+
+
+class RateLimitMiddleware:
+    """
+    Token-bucket throttling for the write endpoints listed in RATE_LIMITS,
+    keyed per client IP and per account, with buckets kept in the shared cache.
+
+    Critical blood requests use their own, more generous per-IP bucket and are
+    never load-shed; other writes are rejected with 429 once this process is
+    already handling RATE_LIMIT_MAX_IN_FLIGHT of them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.rules = getattr(settings, 'RATE_LIMITS', {})
+        self.critical_rule = getattr(settings, 'RATE_LIMIT_CRITICAL', (30, 60))
+        self.max_in_flight = getattr(settings, 'RATE_LIMIT_MAX_IN_FLIGHT', 8)
+
+    def __call__(self, request):
+        rule = self.rules.get(request.path)
+        if rule is None or request.method != 'POST':
+            return self.get_response(request)
+
+        data = request_json(request)
+        critical = is_critical(request, data)
+
+        if not critical and in_flight.count >= self.max_in_flight:
+            return self.too_many(1)
+
+        if critical:
+            buckets = [('critical', client_ip(request), self.critical_rule)]
+        else:
+            buckets = [('ip', client_ip(request), rule.get('ip'))]
+            account = account_key(request, data)
+            if account is not None:
+                buckets.append(('account', account, rule.get('account')))
+
+        for scope, ident, limit in buckets:
+            if limit is None:
+                continue
+            capacity, period = limit
+            allowed, retry_after = take_token(f'rl:{scope}:{request.path}:{ident}', capacity, capacity / period)
+            if not allowed:
+                return self.too_many(retry_after)
+
+        with in_flight:
+            return self.get_response(request)
+
+    def too_many(self, retry_after):
+        response = FastJsonResponse({'error': 'Too many requests'}, status=429)
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class IdempotencyMiddleware:
+    """
+    Honour an Idempotency-Key header on API writes. The first request with a
+    key runs normally and its response is stored; retries with the same key
+    and body get that response replayed instead of writing again. A retry
+    that arrives while the first attempt is still running gets 409.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = getattr(settings, 'API_PREFIX', '/api/')
+        self.exempt = set(getattr(settings, 'IDEMPOTENCY_EXEMPT_PATHS', ()))
+
+    def __call__(self, request):
+        client_key = request.headers.get('Idempotency-Key')
+        if (not client_key or request.method != 'POST'
+                or not request.path.startswith(self.prefix) or request.path in self.exempt):
+            return self.get_response(request)
+
+        if len(client_key) > 255:
+            return FastJsonResponse({'error': 'Idempotency-Key too long'}, status=400)
+
+        key = idempotency.scoped_key(request, client_key)
+        outcome, row = idempotency.claim(key, idempotency.digest(request.body))
+
+        if outcome == idempotency.MISMATCH:
+            return FastJsonResponse({'error': 'Idempotency-Key reused with a different request'}, status=422)
+        if outcome == idempotency.IN_PROGRESS:
+            response = FastJsonResponse({'error': 'A request with this Idempotency-Key is in progress'}, status=409)
+            response['Retry-After'] = '1'
+            return response
+        if outcome == idempotency.REPLAY:
+            response = HttpResponse(bytes(row.body), status=row.status_code, content_type=row.content_type)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+
+        try:
+            response = self.get_response(request)
+        except Exception:
+            idempotency.release(row)
+            raise
+
+        if response.status_code >= 500 or response.streaming:
+            idempotency.release(row)
+        else:
+            idempotency.complete(row, response)
+        return response
@@ -0,0 +1,77 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0007_idempotencykey'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBloodRequest',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('patient_name', models.CharField(max_length=100)),
+                ('blood_group', models.CharField(max_length=5)),
+                ('hospital', models.CharField(max_length=200)),
+                ('city', models.CharField(max_length=100)),
+                ('contact_number', models.CharField(max_length=20)),
+                ('requester_email', models.EmailField(blank=True, max_length=100, null=True)),
+                ('urgency', models.CharField(choices=[('low', 'Standard'), ('medium', 'Urgent'), ('critical', 'Critical')], default='medium', max_length=20)),
+                ('additional_notes', models.TextField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('ALLOCATED', 'Allocated'), ('FULFILLED', 'Fulfilled')], default='FULFILLED', max_length=20)),
+                ('assigned_donor_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedDonation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('units', models.DecimalField(decimal_places=1, max_digits=4)),
+                ('blood_group', models.CharField(max_length=5)),
+                ('center', models.CharField(blank=True, max_length=200)),
+                ('donation_date', models.DateTimeField()),
+                ('is_verified', models.BooleanField(default=True)),
+                ('verified_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(fields=['-created_at'], name='web_bloodre_created_ecd475_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bloodrequest',
+            index=models.Index(fields=['status', 'created_at'], name='web_bloodre_status_b59238_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['donor', '-donation_date'], name='web_donatio_donor_i_c92296_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['is_verified', 'donation_date'], name='web_donatio_is_veri_001162_idx'),
+        ),
+        migrations.AddField(
+            model_name='archiveddonation',
+            name='donor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_donations', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archiveddonation',
+            name='verified_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archiveddonation',
+            index=models.Index(fields=['donor', '-donation_date'], name='web_archive_donor_i_038504_idx'),
+        ),
+    ]
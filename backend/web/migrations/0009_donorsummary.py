@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('web', '0008_archive_tables'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorSummary',
+            fields=[
+                ('donor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='donation_summary', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('donation_count', models.PositiveIntegerField(default=0)),
+                ('verified_count', models.PositiveIntegerField(default=0)),
+                ('units_verified', models.DecimalField(decimal_places=1, default=0, max_digits=10)),
+                ('units_pending', models.DecimalField(decimal_places=1, default=0, max_digits=10)),
+                ('last_donation_at', models.DateTimeField(blank=True, null=True)),
+                ('last_verified_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:05
+
+from django.db import migrations
+from django.db.models import Count, Max, Q, Sum
+
+
+def backfill(apps, schema_editor):
+    Donation = apps.get_model('web', 'Donation')
+    ArchivedDonation = apps.get_model('web', 'ArchivedDonation')
+    DonorSummary = apps.get_model('web', 'DonorSummary')
+
+    summaries = {}
+    for model in (Donation, ArchivedDonation):
+        rows = model.objects.values('donor_id').annotate(
+            donation_count=Count('id'),
+            verified_count=Count('id', filter=Q(is_verified=True)),
+            units_verified=Sum('units', filter=Q(is_verified=True)),
+            units_pending=Sum('units', filter=Q(is_verified=False)),
+            last_donation_at=Max('donation_date'),
+            last_verified_at=Max('verified_at'),
+        )
+        for row in rows:
+            s = summaries.setdefault(row['donor_id'], DonorSummary(donor_id=row['donor_id']))
+            s.donation_count += row['donation_count']
+            s.verified_count += row['verified_count']
+            s.units_verified += row['units_verified'] or 0
+            s.units_pending += row['units_pending'] or 0
+            s.last_donation_at = max(filter(None, [s.last_donation_at, row['last_donation_at']]), default=None)
+            s.last_verified_at = max(filter(None, [s.last_verified_at, row['last_verified_at']]), default=None)
+
+    DonorSummary.objects.bulk_create(summaries.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0009_donorsummary'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
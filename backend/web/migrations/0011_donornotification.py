@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0010_backfill_donorsummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DonorNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sent_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['city', 'blood_group', 'is_eligible'], name='web_donorpr_city_f99991_idx'),
+        ),
+        migrations.AddField(
+            model_name='donornotification',
+            name='blood_request',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='web.bloodrequest'),
+        ),
+        migrations.AddField(
+            model_name='donornotification',
+            name='donor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='donornotification',
+            index=models.Index(fields=['donor', 'sent_at'], name='web_donorno_donor_i_583b7f_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='donornotification',
+            constraint=models.UniqueConstraint(fields=('donor', 'blood_request'), name='unique_donor_notification'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:20
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill(apps, schema_editor):
+    DonorProfile = apps.get_model('web', 'DonorProfile')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    DonorProfile.objects.update(
+        registered_at=Subquery(User.objects.filter(pk=OuterRef('user_id')).values('date_joined')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0011_donornotification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donorprofile',
+            name='registered_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['registered_at', 'id'], name='web_donorpr_registe_5ca84e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['city', 'registered_at'], name='web_donorpr_city_1c074f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['blood_group', 'registered_at'], name='web_donorpr_blood_g_e0232b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['is_eligible', 'registered_at'], name='web_donorpr_is_elig_3c5ef8_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.1 on 2026-10-19 12:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_default_center(apps, schema_editor):
+    # Stock recorded before centers existed is attributed to the default center, so the rollup still adds up
+    Inventory = apps.get_model('web', 'Inventory')
+    CenterInventory = apps.get_model('web', 'CenterInventory')
+    center = getattr(settings, 'DEFAULT_INVENTORY_CENTER', 'Central Blood Bank')
+    CenterInventory.objects.bulk_create([
+        CenterInventory(center=center, blood_group=row.blood_group, units_available=max(row.units_available, 0))
+        for row in Inventory.objects.all()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0013_donationslot_appointment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CenterInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('center', models.CharField(max_length=200)),
+                ('blood_group', models.CharField(max_length=5)),
+                ('units_available', models.DecimalField(decimal_places=1, default=0, max_digits=10)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['blood_group', 'units_available'], name='web_centeri_blood_g_6eee36_idx')],
+                'constraints': [models.UniqueConstraint(fields=('center', 'blood_group'), name='unique_center_inventory'), models.CheckConstraint(condition=models.Q(('units_available__gte', 0)), name='center_inventory_not_negative')],
+            },
+        ),
+        migrations.RunPython(seed_default_center, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 13:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0014_centerinventory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='donation',
+            index=models.Index(fields=['verified_at', 'id'], name='web_donatio_verifie_d1b5f7_idx'),
+        ),
+    ]
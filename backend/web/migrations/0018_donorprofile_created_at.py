@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:36
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill(apps, schema_editor):
+    # Existing profiles were inserted no later than they registered, as far as anyone can tell
+    DonorProfile = apps.get_model('web', 'DonorProfile')
+    DonorProfile.objects.update(created_at=F('registered_at'))
+    # Older verifications were recorded without a time; the analytics export needs one
+    for name in ('Donation', 'ArchivedDonation'):
+        model = apps.get_model('web', name)
+        model.objects.filter(is_verified=True, verified_at__isnull=True).update(verified_at=F('donation_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0017_request_lifecycle'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='donorprofile',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='donorprofile',
+            index=models.Index(fields=['created_at', 'id'], name='web_donorpr_created_eb9d32_idx'),
+        ),
+    ]
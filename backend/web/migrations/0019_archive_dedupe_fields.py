@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0018_donorprofile_created_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedbloodrequest',
+            name='dedupe_key',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='archivedbloodrequest',
+            name='duplicate_of_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='bloodrequest',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='duplicates', to='web.bloodrequest'),
+        ),
+    ]
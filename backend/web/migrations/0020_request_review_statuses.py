@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0019_archive_dedupe_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedbloodrequest',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('ALLOCATED', 'Allocated'), ('FULFILLED', 'Fulfilled'), ('REJECTED', 'Rejected')], default='FULFILLED', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='bloodrequest',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('APPROVED', 'Approved'), ('ALLOCATED', 'Allocated'), ('FULFILLED', 'Fulfilled'), ('REJECTED', 'Rejected')], default='PENDING', max_length=20),
+        ),
+    ]
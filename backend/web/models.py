@@ -1,12 +1,15 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
 class BloodRequest(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
+        ('APPROVED', 'Approved'),  # what the admin dashboard sends when it assigns a donor
         ('ALLOCATED', 'Allocated'),
         ('FULFILLED', 'Fulfilled'),
+        ('REJECTED', 'Rejected'),
     ]
     
     URGENCY_CHOICES = [
@@ -28,6 +31,23 @@ class BloodRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # First time the request reached each status, set by web.lifecycle
+    allocated_at = models.DateTimeField(null=True, blank=True)
+    fulfilled_at = models.DateTimeField(null=True, blank=True)
+    # Likely-duplicate detection, see web.dedupe
+    dedupe_key = models.CharField(max_length=40, blank=True, default='')
+    # No FK constraint: the original may be moved to ArchivedBloodRequest (same id), and its duplicates stay flagged
+    duplicate_of = models.ForeignKey('self', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+                                     related_name='duplicates')
+
+    class Meta:
+        indexes = [
+            # Hot listing sorts by created_at; archival scans closed rows by age
+            models.Index(fields=['-created_at']),
+            models.Index(fields=['status', 'created_at']),
+            # Duplicate check: same blocking key within the dedupe window
+            models.Index(fields=['dedupe_key', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.patient_name} - {self.blood_group} ({self.status})"
@@ -42,10 +62,19 @@ class Donation(models.Model):
     verified_at = models.DateTimeField(null=True, blank=True)
     verified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='verified_donations')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['donor', '-donation_date']),
+            models.Index(fields=['is_verified', 'donation_date']),
+            # export_analytics walks verified donations in (verified_at, id) windows
+            models.Index(fields=['verified_at', 'id']),
+        ]
+
     def __str__(self):
         return f"{self.donor.username} - {self.units} units ({self.donation_date})"
 
 class Inventory(models.Model):
+    """Network-wide units per blood group: the rollup of CenterInventory, kept current by web.inventory."""
     blood_group = models.CharField(max_length=5, unique=True)
     units_available = models.DecimalField(max_digits=10, decimal_places=1, default=0)
     last_updated = models.DateTimeField(auto_now=True)
@@ -53,6 +82,24 @@ class Inventory(models.Model):
     def __str__(self):
         return f"{self.blood_group}: {self.units_available}"
 
+class CenterInventory(models.Model):
+    """Units per blood group held at one donation center. Changed only through web.inventory."""
+    center = models.CharField(max_length=200)
+    blood_group = models.CharField(max_length=5)
+    units_available = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['center', 'blood_group'], name='unique_center_inventory'),
+            models.CheckConstraint(condition=models.Q(units_available__gte=0), name='center_inventory_not_negative'),
+        ]
+        # Cross-center availability: compatible groups first, then only the rows holding stock
+        indexes = [models.Index(fields=['blood_group', 'units_available'])]
+
+    def __str__(self):
+        return f"{self.center} {self.blood_group}: {self.units_available}"
+
 class DonorProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     blood_group = models.CharField(max_length=5, blank=True, null=True)
@@ -60,6 +107,175 @@ class DonorProfile(models.Model):
     city = models.CharField(max_length=100, blank=True, null=True)
     is_eligible = models.BooleanField(default=False)
     last_donation_date = models.DateField(null=True, blank=True)
+    registered_at = models.DateTimeField(default=timezone.now)  # copy of user.date_joined, so the directory can sort without a join
+    created_at = models.DateTimeField(auto_now_add=True)  # when the row was inserted; registered_at can be older
+
+    class Meta:
+        indexes = [
+            # Broadcast donor selection: city + compatible groups, eligible only
+            models.Index(fields=['city', 'blood_group', 'is_eligible']),
+            # Admin directory: each filter paired with the registration-date sort key
+            models.Index(fields=['registered_at', 'id']),
+            models.Index(fields=['city', 'registered_at']),
+            models.Index(fields=['blood_group', 'registered_at']),
+            models.Index(fields=['is_eligible', 'registered_at']),
+            # Incremental analytics export walks new profiles in insert order
+            models.Index(fields=['created_at', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} Profile"
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a write request, replayed when a client retries with the same Idempotency-Key."""
+    key = models.CharField(max_length=64, unique=True)  # sha256 of scope + path + client key
+    fingerprint = models.CharField(max_length=64)  # sha256 of the request body
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)  # null while in progress
+    content_type = models.CharField(max_length=100, blank=True)
+    body = models.BinaryField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.status_code or 'in progress'})"
+
+
+# Cold storage for closed records, moved out of the hot tables by the
+# archive_records management command. Original primary keys are kept.
+
+class ArchivedBloodRequest(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    patient_name = models.CharField(max_length=100)
+    blood_group = models.CharField(max_length=5)
+    hospital = models.CharField(max_length=200)
+    city = models.CharField(max_length=100)
+    contact_number = models.CharField(max_length=20)
+    requester_email = models.EmailField(max_length=100, blank=True, null=True)
+    urgency = models.CharField(max_length=20, choices=BloodRequest.URGENCY_CHOICES, default='medium')
+    additional_notes = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=BloodRequest.STATUS_CHOICES, default='FULFILLED')
+    assigned_donor_id = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField(db_index=True)
+    allocated_at = models.DateTimeField(null=True, blank=True)
+    fulfilled_at = models.DateTimeField(null=True, blank=True)
+    dedupe_key = models.CharField(max_length=40, blank=True, default='')
+    duplicate_of_id = models.BigIntegerField(null=True, blank=True)  # in either table
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.patient_name} - {self.blood_group} (archived)"
+
+class ArchivedDonation(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    donor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_donations')
+    units = models.DecimalField(max_digits=4, decimal_places=1)
+    blood_group = models.CharField(max_length=5)
+    center = models.CharField(max_length=200, blank=True)
+    donation_date = models.DateTimeField()
+    is_verified = models.BooleanField(default=True)
+    verified_at = models.DateTimeField(null=True, blank=True)
+    verified_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['donor', '-donation_date'])]
+
+    def __str__(self):
+        return f"{self.donor.username} - {self.units} units (archived)"
+
+class DonorSummary(models.Model):
+    """Per-donor donation totals, kept current by web.summary whenever a donation is logged, verified or rejected."""
+    donor = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='donation_summary')
+    donation_count = models.PositiveIntegerField(default=0)
+    verified_count = models.PositiveIntegerField(default=0)
+    units_verified = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+    units_pending = models.DecimalField(max_digits=10, decimal_places=1, default=0)
+    last_donation_at = models.DateTimeField(null=True, blank=True)
+    last_verified_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.donor.username}: {self.verified_count} verified donations"
+
+class DonorNotification(models.Model):
+    """One row per donor alerted about a request; used to resume broadcasts and to enforce the cooldown."""
+    donor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    blood_request = models.ForeignKey(BloodRequest, on_delete=models.CASCADE, related_name='notifications')
+    sent_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['donor', 'blood_request'], name='unique_donor_notification'),
+        ]
+        indexes = [models.Index(fields=['donor', 'sent_at'])]
+
+    def __str__(self):
+        return f"{self.donor_id} -> request {self.blood_request_id}"
+
+class DonationSlot(models.Model):
+    """A bookable time slot at a donation center. `booked` only changes through web.appointments."""
+    center = models.CharField(max_length=200)
+    starts_at = models.DateTimeField()
+    capacity = models.PositiveIntegerField()
+    booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves availability queries for one center over a date range
+            models.UniqueConstraint(fields=['center', 'starts_at'], name='unique_center_slot'),
+            models.CheckConstraint(condition=models.Q(booked__lte=models.F('capacity')), name='slot_not_overbooked'),
+        ]
+        indexes = [models.Index(fields=['starts_at', 'center'])]
+
+    def __str__(self):
+        return f"{self.center} {self.starts_at:%Y-%m-%d %H:%M} ({self.booked}/{self.capacity})"
+
+class Appointment(models.Model):
+    donor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='appointments')
+    slot = models.ForeignKey(DonationSlot, on_delete=models.CASCADE, related_name='appointments')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['donor', 'slot'], name='unique_donor_appointment'),
+        ]
+
+    def __str__(self):
+        return f"{self.donor.username} @ {self.slot}"
+
+class RequestStatusChange(models.Model):
+    """Status history of a blood request. Kept when the request is archived, so the id isn't a database constraint."""
+    blood_request = models.ForeignKey(BloodRequest, on_delete=models.DO_NOTHING, db_constraint=False,
+                                      related_name='status_changes')
+    from_status = models.CharField(max_length=20)
+    to_status = models.CharField(max_length=20)
+    changed_at = models.DateTimeField()
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['blood_request', 'changed_at']),
+            models.Index(fields=['to_status', 'changed_at']),
+        ]
+
+    def __str__(self):
+        return f"request {self.blood_request_id}: {self.from_status} -> {self.to_status}"
+
+class LatencyBucket(models.Model):
+    """
+    Histogram of request wait times: how many requests took `bucket`'s span
+    of seconds to be allocated or fulfilled, per urgency, city and blood
+    group. Incremented by web.lifecycle; SLA percentiles are read from here.
+    """
+    metric = models.CharField(max_length=20)  # 'allocate' or 'fulfil'
+    dimension = models.CharField(max_length=20)  # 'all', 'urgency', 'city' or 'blood_group'
+    value = models.CharField(max_length=100)
+    bucket = models.PositiveSmallIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves reading every histogram for one dimension
+            models.UniqueConstraint(fields=['dimension', 'metric', 'value', 'bucket'], name='unique_latency_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.dimension}={self.value} #{self.bucket}: {self.count}"
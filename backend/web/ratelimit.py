@@ -0,0 +1,87 @@
+import json
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+
+def get_cache():
+    return caches[getattr(settings, 'RATE_LIMIT_CACHE', 'default')]
+
+
+def take_token(key, capacity, refill_rate, now=None):
+    """
+    Token bucket kept in the shared cache as (tokens, timestamp).
+    Returns (allowed, retry_after_seconds).
+
+    The read-modify-write isn't atomic across workers, so a burst landing on
+    the same key at the same instant can overdraw by a token or two; that's
+    acceptable for throttling and avoids a lock round trip per request.
+    """
+    cache = get_cache()
+    now = time.time() if now is None else now
+    tokens, stamp = cache.get(key, (capacity, now))
+    tokens = min(capacity, tokens + (now - stamp) * refill_rate)
+
+    if tokens >= 1:
+        tokens -= 1
+        allowed, retry_after = True, 0
+    else:
+        allowed, retry_after = False, math.ceil((1 - tokens) / refill_rate)
+
+    # Keep the entry only as long as it takes to refill completely
+    ttl = math.ceil((capacity - tokens) / refill_rate) + 1
+    cache.set(key, (tokens, now), ttl)
+    return allowed, retry_after
+
+
+class InFlight:
+    """Per-process count of write requests currently being handled."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.count += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.count -= 1
+
+
+in_flight = InFlight()
+
+
+def client_ip(request):
+    if getattr(settings, 'RATE_LIMIT_TRUST_FORWARDED', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def request_json(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def account_key(request, data):
+    """Who the request acts for: the session user, else the email being logged in/registered."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    email = data.get('email')
+    if isinstance(email, str) and email.strip():
+        return f'email:{email.strip().lower()}'
+    return None
+
+
+def is_critical(request, data):
+    return request.path == '/api/request-blood/' and data.get('urgency') == 'critical'
@@ -0,0 +1,99 @@
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+
+def _orjson_default(obj):
+    # orjson handles datetime natively; Decimal and lazy strings go through Django's encoder
+    return DjangoJSONEncoder().default(obj)
+
+
+def _dumps_orjson(data):
+    return orjson.dumps(data, default=_orjson_default)
+
+
+def _dumps_stdlib(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+
+
+JSON_BACKENDS = {
+    'stdlib': _dumps_stdlib,
+}
+if orjson is not None:
+    JSON_BACKENDS['orjson'] = _dumps_orjson
+
+
+def get_json_backend(name=None):
+    """Return the encoder named by API_JSON_BACKEND ('auto' picks the fastest installed one)."""
+    name = name or getattr(settings, 'API_JSON_BACKEND', 'auto')
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in JSON_BACKENDS else 'stdlib'
+    return JSON_BACKENDS[name]
+
+
+def dumps(data, backend=None):
+    return get_json_backend(backend)(data)
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    Drop-in replacement for JsonResponse that encodes with the configured
+    JSON backend. Like JsonResponse, non-dict payloads need safe=False.
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                'In order to allow non-dict objects to be serialized set the '
+                'safe parameter to False.'
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
+
+
+def requested_fields(request):
+    """Parse ?fields=a,b,c into a set, or None when the caller wants every field."""
+    raw = request.GET.get('fields')
+    if not raw:
+        return None
+    return {f.strip() for f in raw.split(',') if f.strip()}
+
+
+def sparse(rows, fields):
+    """Trim each row dict down to the requested sparse fieldset."""
+    if fields is None:
+        return rows
+    return [{k: v for k, v in row.items() if k in fields} for row in rows]
+
+
+def choose_encoding(accept_encoding, offered):
+    """
+    The first content-coding in `offered` (in our order of preference) that
+    the Accept-Encoding header allows, else 'identity'. A coding with q=0 is
+    refused, and `*` stands for any coding the header doesn't list.
+    """
+    qualities = {}
+    for token in (accept_encoding or '').split(','):
+        coding, _, params = token.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    for coding in offered:
+        if qualities.get(coding, qualities.get('*', 0.0)) > 0:
+            return coding
+    return 'identity'
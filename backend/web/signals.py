@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import Inventory
+from .snapshot import inventory_snapshot
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def publish_inventory_snapshot(sender, **kwargs):
+    # Publish only once the change is visible to other workers' database reads
+    transaction.on_commit(inventory_snapshot.refresh)
@@ -0,0 +1,145 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from django.conf import settings
+
+BLOOD_GROUPS = ('A+', 'A-', 'B+', 'B-', 'AB+', 'AB-', 'O+', 'O-')
+
+# Layout: version (u64), flags (u64), then one f64 per blood group.
+# An odd version means a write is in progress (seqlock); NaN marks a group with no Inventory row.
+VERSION = struct.Struct('<Q')
+FLAGS = struct.Struct('<Q')
+HEADER = struct.Struct('<QQ')
+SLOTS = struct.Struct('<' + 'd' * len(BLOOD_GROUPS))
+SIZE = HEADER.size + SLOTS.size
+
+POPULATED = 1
+OVERFLOW = 2  # inventory holds groups outside BLOOD_GROUPS, readers must use the database
+
+# Torn or in-progress reads a reader retries before giving up and using the database
+MAX_READ_RETRIES = 10000
+
+
+class InventorySnapshot:
+    """
+    Inventory units per blood group in a fixed-layout shared-memory segment
+    (an mmap'd file under /dev/shm), so every worker process on the host can
+    serve /api/get-inventory/ without a database round trip. Writers
+    serialise on flock() and publish with a seqlock; readers never block and
+    retry on a torn read.
+    """
+
+    def __init__(self, name=None):
+        self._name = name
+        self._shm = None
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._synced = False
+
+    @property
+    def name(self):
+        if self._name:
+            return self._name
+        configured = getattr(settings, 'INVENTORY_SHM_NAME', None)
+        if configured:
+            return configured
+        # One segment per database, so test runs and other deployments on the host don't share it
+        db = str(settings.DATABASES['default']['NAME'])
+        return 'bloodconnect_inv_' + hashlib.sha1(db.encode('utf-8')).hexdigest()[:12]
+
+    @property
+    def path(self):
+        # /dev/shm is tmpfs on Linux, so the mapping never touches disk
+        directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+        return os.path.join(directory, self.name)
+
+    def _segment(self):
+        # flock() is per open file, so a forked worker needs its own descriptor
+        if self._shm is not None and self._pid != os.getpid():
+            self._shm, self._fd, self._synced = None, None, False
+        if self._shm is None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            # Extending a new file zero-fills it, i.e. version 0 and not yet populated
+            if os.fstat(fd).st_size < SIZE:
+                os.ftruncate(fd, SIZE)
+            self._fd, self._pid = fd, os.getpid()
+            self._shm = mmap.mmap(fd, SIZE)
+        return self._shm
+
+    def write(self, units):
+        """Publish {blood_group: units}. Groups missing from `units` read back as absent."""
+        buf = self._segment()
+        overflow = any(group not in BLOOD_GROUPS for group in units)
+        values = [float(units[g]) if g in units else math.nan for g in BLOOD_GROUPS]
+
+        # The thread lock covers writers in this process, flock() covers other processes
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                # Forced odd/even rather than +1/+2, so a writer killed mid-write (leaving
+                # the version odd under a lock it no longer holds) can't flip the parity for good
+                writing = VERSION.unpack_from(buf, 0)[0] | 1
+                VERSION.pack_into(buf, 0, writing)
+                FLAGS.pack_into(buf, VERSION.size, POPULATED | (OVERFLOW if overflow else 0))
+                SLOTS.pack_into(buf, HEADER.size, *values)
+                VERSION.pack_into(buf, 0, writing + 1)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def read(self):
+        """Return (version, {blood_group: units}), or None if the snapshot can't answer."""
+        buf = self._segment()
+        for _ in range(MAX_READ_RETRIES):
+            version = VERSION.unpack_from(buf, 0)[0]
+            if version % 2:
+                continue
+            flags = FLAGS.unpack_from(buf, VERSION.size)[0]
+            values = SLOTS.unpack_from(buf, HEADER.size)
+            if VERSION.unpack_from(buf, 0)[0] == version:
+                break
+        else:
+            return None  # stuck mid-write, e.g. the writer died; callers fall back to the database
+        if not flags & POPULATED or flags & OVERFLOW:
+            return None
+        return version, {g: v for g, v in zip(BLOOD_GROUPS, values) if not math.isnan(v)}
+
+    def refresh(self):
+        """Republish from the database; called after any Inventory change commits."""
+        from .models import Inventory
+        units = {g: float(u) for g, u in Inventory.objects.values_list('blood_group', 'units_available')}
+        self.write(units)
+        self._synced = True
+        return units
+
+    def units(self):
+        """
+        Current {blood_group: units}. Each process resyncs from the database on
+        its first call, in case the table changed while no worker was running.
+        """
+        if self._synced:
+            snapshot = self.read()
+            if snapshot is not None:
+                return snapshot[1]
+        return self.refresh()
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            os.close(self._fd)
+            self._shm = None
+
+    def unlink(self):
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+inventory_snapshot = InventorySnapshot()
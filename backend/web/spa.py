@@ -0,0 +1,79 @@
+import gzip
+import hashlib
+import os
+import threading
+from django.conf import settings
+from .responses import choose_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class ShellCache:
+    """
+    Keeps the built SPA shell (dist/index.html) in memory as raw, gzip and
+    brotli byte buffers, plus a strong ETag. In DEBUG the file's mtime is
+    checked on each read so a fresh `npm run build` is picked up.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = None
+
+    def _path(self):
+        return str(getattr(settings, 'SPA_INDEX_PATH', settings.BASE_DIR.parent / 'dist' / 'index.html'))
+
+    def _load(self, path, mtime):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        variants = {'identity': raw, 'gzip': gzip.compress(raw, compresslevel=9)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(raw)
+        digest = hashlib.sha1(raw).hexdigest()
+        return {'path': path, 'mtime': mtime, 'digest': digest, 'variants': variants}
+
+    def get(self):
+        """Return the cached entry, or None if the shell hasn't been built."""
+        entry = self._entry
+        path = self._path()
+        if entry is not None and entry['path'] == path and not settings.DEBUG:
+            return entry
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        if entry is not None and entry['path'] == path and entry['mtime'] == mtime:
+            return entry
+        with self._lock:
+            self._entry = self._load(path, mtime)
+            return self._entry
+
+    def clear(self):
+        self._entry = None
+
+
+shell_cache = ShellCache()
+
+
+def etag_for(entry, encoding):
+    # Each encoding is a different representation, so it gets its own tag
+    if encoding == 'identity':
+        return '"%s"' % entry['digest']
+    return '"%s-%s"' % (entry['digest'], encoding)
+
+
+def not_modified(entry, if_none_match):
+    """True if the If-None-Match header names any representation of the current shell."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    current = {etag_for(entry, e) for e in entry['variants']}
+    tags = (t.strip() for t in if_none_match.split(','))
+    return any((t[2:] if t.startswith('W/') else t) in current for t in tags)
+
+
+def pick_encoding(accept_encoding, variants):
+    return choose_encoding(accept_encoding, [e for e in ('br', 'gzip') if e in variants])
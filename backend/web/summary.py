@@ -0,0 +1,73 @@
+from decimal import Decimal
+from django.db.models import F, Max
+from django.db.models.functions import Coalesce, Greatest
+from . import counters
+from .models import ArchivedDonation, Donation, DonorSummary
+
+
+def _update(donor_id, **changes):
+    counters.add(DonorSummary, {'donor_id': donor_id}, **changes)
+
+
+def _latest(field, value):
+    # SQLite's MAX() returns NULL if either side is NULL, so seed an empty column with the new value
+    return Greatest(Coalesce(F(field), value), value)
+
+
+def _units(donation):
+    return Decimal(str(donation.units))
+
+
+def donation_logged(donation):
+    _update(
+        donation.donor_id,
+        donation_count=F('donation_count') + 1,
+        units_pending=F('units_pending') + _units(donation),
+        last_donation_at=_latest('last_donation_at', donation.donation_date),
+    )
+
+
+def donation_verified(donation):
+    _update(
+        donation.donor_id,
+        verified_count=F('verified_count') + 1,
+        units_verified=F('units_verified') + _units(donation),
+        units_pending=F('units_pending') - _units(donation),
+        last_verified_at=_latest('last_verified_at', donation.verified_at),
+    )
+
+
+def donation_rejected(donation):
+    """Call after the donation row has been deleted."""
+    if donation.is_verified:
+        # Rare path: the latest verification may be the one being removed
+        # Archived donations are all verified and count towards the badge too
+        latest = max(filter(None, (
+            model.objects.filter(donor_id=donation.donor_id, is_verified=True).aggregate(latest=Max('verified_at'))['latest']
+            for model in (Donation, ArchivedDonation)
+        )), default=None)
+        _update(
+            donation.donor_id,
+            donation_count=F('donation_count') - 1,
+            verified_count=F('verified_count') - 1,
+            units_verified=F('units_verified') - _units(donation),
+            last_verified_at=latest,
+        )
+    else:
+        _update(
+            donation.donor_id,
+            donation_count=F('donation_count') - 1,
+            units_pending=F('units_pending') - _units(donation),
+        )
+
+
+def summary_for(donor_id):
+    s = DonorSummary.objects.filter(donor_id=donor_id).first() or DonorSummary(donor_id=donor_id)
+    return {
+        'donation_count': s.donation_count,
+        'verified_count': s.verified_count,
+        'units_verified': float(s.units_verified),
+        'units_pending': float(s.units_pending),
+        'last_donation_at': s.last_donation_at.isoformat() if s.last_donation_at else None,
+        'last_verified_at': s.last_verified_at.isoformat() if s.last_verified_at else None,
+    }
@@ -0,0 +1,218 @@
+"""
+Per-endpoint query-count and latency budgets.
+
+Every route in core/urls.py has an entry in ROUTES. Each scale class seeds
+the database with roughly SCALE rows per table and checks every route
+against its query ceiling and latency budget. ScaleIndependenceTests then
+asserts that no route's query count changes as the tables grow, which is
+how N+1 regressions show up.
+
+Latency budgets are `fixed_ms + per_row_ms * SCALE`, multiplied by the
+LATENCY_BUDGET_FACTOR environment variable on slow machines.
+"""
+import gc
+import json
+import os
+import time
+from datetime import timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from django.utils import timezone
+from .models import Appointment, BloodRequest, CenterInventory, Donation, DonationSlot, DonorProfile, DonorSummary, Inventory
+from .snapshot import BLOOD_GROUPS, inventory_snapshot
+
+CITIES = ('Pune', 'Delhi', 'Mumbai', 'Chennai', 'Kolkata')
+FACTOR = float(os.environ.get('LATENCY_BUDGET_FACTOR', '1'))
+
+
+def body(**data):
+    return lambda fx: data
+
+
+# route pattern -> (method, path, request body, who is logged in, max queries, (fixed_ms, per_row_ms))
+# Counts include savepoints; views that read request.user add 2 queries for the session and user.
+ROUTES = {
+    'admin/': ('GET', '/admin/login/', None, None, 0, (200, 0)),
+    'api/login/': ('POST', '/api/login/', body(email='donor@example.com', password='pw'), None, 10, (100, 0)),
+    'api/register/': ('POST', '/api/register/', body(email='new@example.com', password='pw'), None, 12, (100, 0)),
+    'api/logout/': ('POST', '/api/logout/', None, 'donor', 4, (50, 0)),
+    'api/user/': ('GET', '/api/user/', None, 'donor', 3, (50, 0)),
+    'api/get-inventory/': ('GET', '/api/get-inventory/', None, None, 0, (50, 0)),
+    'api/inventory/availability/': ('GET', '/api/inventory/availability/?bloodGroup=AB%2B&units=5', None, None, 1, (50, 0)),
+    'api/csrf/': ('GET', '/api/csrf/', None, None, 0, (50, 0)),
+    'api/update-eligibility/': ('POST', '/api/update-eligibility/', body(isEligible=True, city='Pune'), 'donor', 4, (50, 0)),
+    'api/request-blood/': ('POST', '/api/request-blood/', body(
+        patientName='P', bloodGroup='A+', hospital='H', city='Pune', contactNumber='1', urgency='medium',
+    ), None, 2, (50, 0)),
+    'api/all-requests/': ('GET', '/api/all-requests/', None, None, 1, (50, 0.05)),
+    'api/allocate-donor/': ('POST', '/api/allocate-donor/', lambda fx: {
+        'requestId': fx['request_id'], 'donorId': fx['donor'].id, 'status': 'allocated',
+    }, 'staff', 14, (100, 0)),
+    'api/donate/': ('POST', '/api/donate/', body(units='1.0', bloodGroup='A+', center='City'), 'donor', 6, (50, 0)),
+    'api/my-donations/': ('GET', '/api/my-donations/', None, 'donor', 3, (50, 0.05)),
+    'api/my-donations/summary/': ('GET', '/api/my-donations/summary/', None, 'donor', 3, (50, 0)),
+    'api/slots/': ('GET', '/api/slots/', None, None, 1, (50, 0)),
+    'api/slots/book/': ('POST', '/api/slots/book/', lambda fx: {'slotId': fx['slot_id']}, 'donor', 6, (50, 0)),
+    'api/appointments/': ('GET', '/api/appointments/', None, 'donor', 3, (50, 0)),
+    'api/appointments/cancel/': ('POST', '/api/appointments/cancel/', lambda fx: {
+        'appointmentId': fx['appointment_id'],
+    }, 'donor', 7, (50, 0)),
+    'api/admin/donations/pending/': ('GET', '/api/admin/donations/pending/', None, 'staff', 1, (50, 0.05)),
+    'api/admin/donations/verify/': ('POST', '/api/admin/donations/verify/', lambda fx: {
+        'donationId': fx['pending_id'], 'action': 'approve',
+    }, 'staff', 16, (100, 0)),
+    'api/admin/stats/': ('GET', '/api/admin/stats/', None, 'staff', 6, (50, 0.01)),
+    'api/admin/sla/': ('GET', '/api/admin/sla/?by=urgency', None, 'staff', 3, (50, 0)),
+    'api/admin/donors/': ('GET', '/api/admin/donors/?city=Pune&eligible=true&limit=50', None, 'staff', 2, (50, 0)),
+    'api/admin/inventory/issue/': ('POST', '/api/admin/inventory/issue/', body(
+        center='Pune', bloodGroup='A+', units=2,
+    ), 'staff', 6, (50, 0)),
+    'api/admin/slots/': ('POST', '/api/admin/slots/', body(
+        center='New Center', startsAt='2030-01-01T09:00:00Z', capacity=10,
+    ), 'staff', 5, (50, 0)),
+    '^.*$': ('GET', '/dashboard', None, None, 0, (50, 0)),
+}
+
+
+def seed(scale, start=0):
+    """Bulk-insert `scale` donors, donations, requests and hourly appointment slots, numbered from `start`."""
+    password = make_password(None)
+    now = timezone.now()
+    users = User.objects.bulk_create([
+        User(username=f'seed{i}@example.com', email=f'seed{i}@example.com', password=password)
+        for i in range(start, start + scale)
+    ])
+    DonorProfile.objects.bulk_create([
+        DonorProfile(user=u, blood_group=BLOOD_GROUPS[i % 8], city=CITIES[i % 5], is_eligible=i % 2 == 0)
+        for i, u in enumerate(users)
+    ])
+    Donation.objects.bulk_create([
+        Donation(donor=u, units=1, blood_group=BLOOD_GROUPS[i % 8], center=CITIES[i % 5], is_verified=i % 2 == 0)
+        for i, u in enumerate(users)
+    ])
+    BloodRequest.objects.bulk_create([
+        BloodRequest(patient_name=f'Patient {i}', blood_group=BLOOD_GROUPS[i % 8], hospital='H',
+                     city=CITIES[i % 5], contact_number='1', requester_email=f'family{i}@example.com',
+                     status=('PENDING', 'ALLOCATED', 'FULFILLED')[i % 3], created_at=now - timedelta(minutes=i))
+        for i in range(start, start + scale)
+    ])
+    DonationSlot.objects.bulk_create([
+        DonationSlot(center=CITIES[i % 5], starts_at=now + timedelta(hours=i + 1), capacity=10)
+        for i in range(start, start + scale)
+    ])
+
+
+def seed_actors(scale):
+    """The logged-in donor (with scale/10 donations of their own) and a staff user."""
+    donor = User.objects.create(username='donor@example.com', email='donor@example.com', password=make_password('pw'))
+    DonorProfile.objects.create(user=donor, blood_group='A+', city='Pune', is_eligible=True)
+    Donation.objects.bulk_create([
+        Donation(donor=donor, units=1, blood_group='A+', is_verified=i % 2 == 0) for i in range(max(1, scale // 10))
+    ])
+    DonorSummary.objects.create(donor=donor, donation_count=max(1, scale // 10))
+    staff = User.objects.create(username='admin@example.com', is_staff=True, password=make_password('pw'))
+    CenterInventory.objects.bulk_create([
+        CenterInventory(center=c, blood_group=g, units_available=10) for c in CITIES for g in BLOOD_GROUPS
+    ])
+    Inventory.objects.bulk_create([Inventory(blood_group=g, units_available=10 * len(CITIES)) for g in BLOOD_GROUPS])
+    slot = DonationSlot.objects.order_by('starts_at').first()
+    Appointment.objects.create(donor=donor, slot=slot)
+    DonationSlot.objects.filter(id=slot.id).update(booked=1)
+    return donor, staff
+
+
+# Fast hashing, and per-process caches so rate limits and counts start cold on every call
+budget_settings = override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    RATE_LIMIT_CACHE='default',
+    DONOR_COUNT_CACHE='default',
+)
+
+
+class SeededRoutesMixin:
+    """Seeds SCALE rows per table, the logged-in actors and route fixtures; call() times one route."""
+    SCALE = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(cls.SCALE)
+        cls.donor, cls.staff = seed_actors(cls.SCALE)
+        cls.request_id = BloodRequest.objects.order_by('id').values_list('id', flat=True).first()
+        cls.pending_id = Donation.objects.filter(is_verified=False).values_list('id', flat=True).first()
+        cls.slot_id = DonationSlot.objects.filter(booked=0).order_by('starts_at').values_list('id', flat=True).first()
+        cls.appointment_id = Appointment.objects.values_list('id', flat=True).get()
+
+    def setUp(self):
+        caches['default'].clear()
+        inventory_snapshot.refresh()
+
+    def call(self, route):
+        method, path, make_body, actor, _, _ = ROUTES[route]
+        fixtures = {
+            'donor': self.donor, 'request_id': self.request_id, 'pending_id': self.pending_id,
+            'slot_id': self.slot_id, 'appointment_id': self.appointment_id,
+        }
+        client = self.client_class()
+        if actor:
+            client.force_login(self.donor if actor == 'donor' else self.staff)
+        if method == 'GET':
+            send = lambda: client.get(path)
+        else:
+            payload = json.dumps(make_body(fixtures) if make_body else {})
+            send = lambda: client.post(path, payload, content_type='application/json')
+
+        # Roll each call back so writes don't change what the next call sees, and start with cold caches
+        caches['default'].clear()
+        gc.collect()  # so a collection of seed garbage isn't billed to whichever route runs next
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = send()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            transaction.set_rollback(True)
+        self.assertLess(response.status_code, 500, route)
+        return len(queries), elapsed_ms
+
+class RouteBudgetsMixin(SeededRoutesMixin):
+    def test_every_route_within_budget(self):
+        for route, (_, _, _, _, max_queries, (fixed_ms, per_row_ms)) in ROUTES.items():
+            with self.subTest(route=route, scale=self.SCALE):
+                queries, elapsed_ms = self.call(route)
+                self.assertLessEqual(queries, max_queries, f'{route}: {queries} queries')
+                budget_ms = (fixed_ms + per_row_ms * self.SCALE) * FACTOR
+                self.assertLessEqual(elapsed_ms, budget_ms, f'{route}: {elapsed_ms:.0f}ms > {budget_ms:.0f}ms')
+
+
+@budget_settings
+class Budget10Tests(RouteBudgetsMixin, TestCase):
+    SCALE = 10
+
+
+@budget_settings
+class Budget1kTests(RouteBudgetsMixin, TestCase):
+    SCALE = 1000
+
+
+@budget_settings
+class Budget50kTests(RouteBudgetsMixin, TestCase):
+    SCALE = 50000
+
+
+@budget_settings
+class ScaleIndependenceTests(SeededRoutesMixin, TestCase):
+
+    def test_every_route_is_budgeted(self):
+        patterns = {str(p.pattern) for p in get_resolver().url_patterns}
+        self.assertEqual(patterns - set(ROUTES), set())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        small = {route: self.call(route)[0] for route in ROUTES}
+        seed(1000, start=self.SCALE)
+        Donation.objects.bulk_create([Donation(donor=self.donor, units=1, blood_group='A+') for _ in range(100)])
+        for route in ROUTES:
+            with self.subTest(route=route):
+                self.assertEqual(self.call(route)[0], small[route], route)
@@ -0,0 +1,24 @@
+import logging.config
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class QuietLogsRunner(DiscoverRunner):
+    """
+    Discards the app's JSON logs while tests run, so records and tracebacks
+    from views under test don't interleave with the runner's output. Tests
+    that check logging attach their own handler and stream.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.quiet_logs = override_settings(LOG_STREAM=None)
+        self.quiet_logs.enable()
+        # Handlers pick their destination when built, so rebuild them under the override
+        logging.config.dictConfig(settings.LOGGING)
+
+    def teardown_test_environment(self, **kwargs):
+        self.quiet_logs.disable()
+        logging.config.dictConfig(settings.LOGGING)
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,968 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import logging
+import multiprocessing
+import threading
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import quote
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from . import appointments, dedupe, idempotency, inventory, lifecycle, logs, summary
+from .broadcast import broadcast
+from .management.commands import export_analytics
+from .models import (
+    ArchivedBloodRequest, ArchivedDonation, BloodRequest, CenterInventory, Donation, DonationSlot,
+    DonorNotification, DonorProfile, IdempotencyKey, Inventory, RequestStatusChange,
+)
+from .ratelimit import take_token
+from .responses import FastJsonResponse, JSON_BACKENDS, choose_encoding
+from .snapshot import BLOOD_GROUPS, VERSION, InventorySnapshot, inventory_snapshot
+from .spa import shell_cache
 
-# Create your tests here.
+
+class FastJsonResponseTests(TestCase):
+    def test_backends_agree(self):
+        payload = [{'id': 1, 'blood_group': 'O+', 'units_available': 2.5}]
+        for name, dumps in JSON_BACKENDS.items():
+            self.assertEqual(json.loads(dumps(payload)), payload, name)
+
+    def test_non_dict_requires_safe_false(self):
+        with self.assertRaises(TypeError):
+            FastJsonResponse([1, 2])
+        self.assertEqual(json.loads(FastJsonResponse([1, 2], safe=False).content), [1, 2])
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        BloodRequest.objects.create(
+            patient_name='Test', blood_group='A+', hospital='City', city='Pune',
+            contact_number='123', requester_email='a@example.com', additional_notes='notes',
+        )
+
+    def test_full_payload_by_default(self):
+        rows = self.client.get('/api/all-requests/').json()
+        self.assertIn('requester_email', rows[0])
+
+    def test_fields_param_trims_rows(self):
+        rows = self.client.get('/api/all-requests/?fields=id,status').json()
+        self.assertEqual(set(rows[0]), {'id', 'status'})
+
+
+class ApiCompressionTests(TestCase):
+    def setUp(self):
+        for group in ('A+', 'A-', 'B+', 'B-', 'O+', 'O-', 'AB+', 'AB-'):
+            Inventory.objects.create(blood_group=group, units_available=10)
+        inventory_snapshot.refresh()
+
+    @override_settings(API_COMPRESS_MIN_SIZE=100)
+    def test_large_response_is_gzipped(self):
+        response = self.client.get('/api/get-inventory/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 8)
+
+    @override_settings(API_COMPRESS_MIN_SIZE=100)
+    def test_refused_encodings_are_not_used(self):
+        response = self.client.get('/api/get-inventory/', HTTP_ACCEPT_ENCODING='br;q=0, gzip;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get('/api/get-inventory/', HTTP_ACCEPT_ENCODING='br;q=0, *')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_choose_encoding_reads_qualities(self):
+        self.assertEqual(choose_encoding('gzip, br', ('br', 'gzip')), 'br')
+        self.assertEqual(choose_encoding('br;q=0, gzip;q=0.5', ('br', 'gzip')), 'gzip')
+        self.assertEqual(choose_encoding('*;q=0', ('br', 'gzip')), 'identity')
+        self.assertEqual(choose_encoding('BR; Q=0.1', ('br',)), 'br')
+        self.assertEqual(choose_encoding('', ('gzip',)), 'identity')
+
+    def test_small_response_left_alone(self):
+        response = self.client.get('/api/user/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class ReactAppViewTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.index = os.path.join(self.tmp.name, 'index.html')
+        with open(self.index, 'w') as f:
+            f.write('<!doctype html><div id="root"></div>' * 20)
+        self.settings_override = override_settings(SPA_INDEX_PATH=self.index)
+        self.settings_override.enable()
+        shell_cache.clear()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shell_cache.clear()
+        self.tmp.cleanup()
+
+    def test_serves_shell_with_etag(self):
+        response = self.client.get('/donors')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'id="root"', response.content)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_conditional_request_returns_304(self):
+        etag = self.client.get('/').headers['ETag']
+        response = self.client.get('/dashboard', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_gzip_variant_served_from_memory(self):
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn(b'id="root"', gzip.decompress(response.content))
+
+    def test_refused_gzip_gets_the_raw_shell(self):
+        response = self.client.get('/', HTTP_ACCEPT_ENCODING='gzip;q=0, br;q=0')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn(b'id="root"', response.content)
+
+    def test_missing_build_is_404(self):
+        with override_settings(SPA_INDEX_PATH=os.path.join(self.tmp.name, 'missing.html')):
+            self.assertEqual(self.client.get('/anything').status_code, 404)
+
+
+@override_settings(
+    RATE_LIMIT_CACHE='default',
+    RATE_LIMITS={'/api/request-blood/': {'ip': (2, 60)}},
+    RATE_LIMIT_CRITICAL=(5, 60),
+)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def post_request(self, urgency='medium'):
+        return self.client.post('/api/request-blood/', json.dumps({
+            'patientName': 'P', 'bloodGroup': 'O-', 'hospital': 'H', 'city': 'Pune',
+            'contactNumber': '1', 'urgency': urgency,
+        }), content_type='application/json')
+
+    def test_bucket_exhaustion_returns_429_with_retry_after(self):
+        self.assertEqual(self.post_request().status_code, 200)
+        self.assertEqual(self.post_request().status_code, 200)
+        response = self.post_request()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_critical_requests_use_their_own_lane(self):
+        self.post_request()
+        self.post_request()
+        self.assertEqual(self.post_request().status_code, 429)
+        self.assertEqual(self.post_request('critical').status_code, 200)
+
+    def test_overload_sheds_non_critical_first(self):
+        with override_settings(RATE_LIMIT_MAX_IN_FLIGHT=0):
+            self.assertEqual(self.post_request().status_code, 429)
+            self.assertEqual(self.post_request('critical').status_code, 200)
+
+    def test_bucket_refills(self):
+        self.assertTrue(take_token('t', 1, 1, now=100)[0])
+        self.assertFalse(take_token('t', 1, 1, now=100.5)[0])
+        self.assertTrue(take_token('t', 1, 1, now=101.5)[0])
+
+
+@override_settings(RATE_LIMIT_CACHE='default')
+class IdempotencyTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='donor@example.com', password='pw')
+        self.client.force_login(self.user)
+
+    def donate(self, key, units='1.0'):
+        return self.client.post('/api/donate/', json.dumps({'units': units, 'bloodGroup': 'A+'}),
+                                content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_without_writing_again(self):
+        first = self.donate('abc')
+        second = self.donate('abc')
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Donation.objects.count(), 1)
+
+    def test_distinct_keys_write_separately(self):
+        self.donate('one')
+        self.donate('two')
+        self.assertEqual(Donation.objects.count(), 2)
+
+    def test_key_reused_with_different_body_is_rejected(self):
+        self.donate('abc')
+        self.assertEqual(self.donate('abc', units='2.0').status_code, 422)
+
+    def test_concurrent_duplicate_gets_409(self):
+        request = RequestFactory().post('/api/donate/')
+        request.user = self.user
+        key = idempotency.scoped_key(request, 'abc')
+        body = json.dumps({'units': '1.0', 'bloodGroup': 'A+'}).encode()
+        outcome, _ = idempotency.claim(key, idempotency.digest(body))
+        self.assertEqual(outcome, idempotency.CLAIMED)
+        self.assertEqual(self.donate('abc').status_code, 409)
+        self.assertEqual(Donation.objects.count(), 0)
+
+    def test_abandoned_claim_is_taken_over_after_the_lease(self):
+        request = RequestFactory().post('/api/donate/')
+        request.user = self.user
+        key = idempotency.scoped_key(request, 'abc')
+        body = json.dumps({'units': '1.0', 'bloodGroup': 'A+'}).encode()
+        _, dead = idempotency.claim(key, idempotency.digest(body))  # its worker is killed mid-request
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        with override_settings(IDEMPOTENCY_LOCK_TIMEOUT=60):
+            self.assertEqual(self.donate('abc').status_code, 200)
+            self.assertEqual(self.donate('abc')['Idempotent-Replayed'], 'true')
+        self.assertEqual(Donation.objects.count(), 1)
+        idempotency.release(dead)  # the old claimant can no longer touch the new outcome
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 200)
+
+    def test_expired_keys_are_reclaimed(self):
+        self.donate('abc')
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(days=2))
+        self.donate('abc')
+        self.assertEqual(Donation.objects.count(), 2)
+
+
+def _snapshot_reader(name, seconds, results):
+    snapshot = InventorySnapshot(name)
+    reads, torn = 0, 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        result = snapshot.read()
+        if result is None:  # gave up behind a busy writer, which is allowed
+            continue
+        _, units = result
+        # The writer always stores the same value in every slot
+        if len(set(units.values())) != 1 or len(units) != len(BLOOD_GROUPS):
+            torn += 1
+        reads += 1
+    snapshot.close()
+    results.put((reads, torn))
+
+
+class InventorySnapshotTests(SimpleTestCase):
+    def setUp(self):
+        self.snapshot = InventorySnapshot(f'test_inv_{os.getpid()}')
+
+    def tearDown(self):
+        self.snapshot.unlink()
+
+    def test_round_trip(self):
+        self.assertIsNone(self.snapshot.read())
+        self.snapshot.write({'A+': 3.5, 'O-': 1})
+        version, units = self.snapshot.read()
+        self.assertEqual(units, {'A+': 3.5, 'O-': 1.0})
+        self.snapshot.write({'A+': 4})
+        self.assertGreater(self.snapshot.read()[0], version)
+
+    def test_writer_killed_mid_write_does_not_wedge_readers(self):
+        self.snapshot.write({'A+': 1})
+        # What a writer leaves behind if it dies between its two version stores
+        buf = self.snapshot._segment()
+        VERSION.pack_into(buf, 0, VERSION.unpack_from(buf, 0)[0] + 1)
+        self.assertIsNone(self.snapshot.read())
+        self.snapshot.write({'A+': 2})
+        self.assertEqual(self.snapshot.read()[1], {'A+': 2.0})
+        self.snapshot.write({'A+': 3})
+        self.assertEqual(self.snapshot.read()[1], {'A+': 3.0})
+
+    def test_unknown_group_forces_database_fallback(self):
+        self.snapshot.write({'A+': 1, 'Bombay': 2})
+        self.assertIsNone(self.snapshot.read())
+
+    def test_multi_process_readers_never_see_torn_writes(self):
+        self.snapshot.write({g: 0 for g in BLOOD_GROUPS})
+        ctx = multiprocessing.get_context('fork')
+        results = ctx.Queue()
+        readers = [ctx.Process(target=_snapshot_reader, args=(self.snapshot.name, 1.0, results)) for _ in range(3)]
+        for p in readers:
+            p.start()
+
+        writes = 0
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            writes += 1
+            self.snapshot.write({g: writes for g in BLOOD_GROUPS})
+
+        stats = [results.get(timeout=10) for _ in readers]
+        for p in readers:
+            p.join()
+        total_reads = sum(reads for reads, _ in stats)
+        self.assertEqual(sum(torn for _, torn in stats), 0)
+        # A database query takes ~100us; shared-memory reads should beat that comfortably
+        self.assertGreater(total_reads, 10000, f'{total_reads} reads/s across {len(readers)} processes')
+
+
+class InventorySnapshotViewTests(TestCase):
+    def test_verified_donation_is_published_to_snapshot(self):
+        donor = User.objects.create_user(username='d@example.com', password='pw')
+        donation = Donation.objects.create(donor=donor, units=2, blood_group='B+')
+        inventory_snapshot.refresh()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/admin/donations/verify/', json.dumps(
+                {'donationId': donation.id, 'action': 'approve'}), content_type='application/json')
+        with self.assertNumQueries(0):
+            rows = self.client.get('/api/get-inventory/').json()
+        self.assertEqual(rows, [{'blood_group': 'B+', 'units_available': 2.0}])
+
+
+
+@override_settings(RATE_LIMIT_CACHE='default')
+class CenterInventoryTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.client.force_login(User.objects.create(username='admin@example.com', is_staff=True))
+
+    def verify(self, center, blood_group, units):
+        donor = User.objects.create(username=f'{center}-{blood_group}-{units}@example.com')
+        donation = Donation.objects.create(donor=donor, units=units, blood_group=blood_group, center=center)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/admin/donations/verify/', json.dumps(
+                {'donationId': donation.id, 'action': 'approve'}), content_type='application/json')
+
+    def issue(self, **data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/admin/inventory/issue/', json.dumps(data), content_type='application/json')
+
+    def stock(self):
+        return {(c.center, c.blood_group): float(c.units_available) for c in CenterInventory.objects.all()}
+
+    def test_rollup_tracks_center_stock(self):
+        self.verify('Ruby Hall', 'A+', 2)
+        self.verify('KEM', 'A+', 1)
+        self.verify('', 'O-', 1)
+        self.assertEqual(self.issue(center='Ruby Hall', bloodGroup='A+', units=1.5).status_code, 200)
+        self.assertEqual(self.issue(center='KEM', bloodGroup='A+', units=2).status_code, 409)
+
+        self.assertEqual(self.stock(), {
+            ('Ruby Hall', 'A+'): 0.5, ('KEM', 'A+'): 1.0, ('Central Blood Bank', 'O-'): 1.0,
+        })
+        rollup = {i.blood_group: float(i.units_available) for i in Inventory.objects.all()}
+        self.assertEqual(rollup, {'A+': 1.5, 'O-': 1.0})
+        with self.assertNumQueries(0):
+            served = {r['blood_group']: r['units_available'] for r in self.client.get('/api/get-inventory/').json()}
+        self.assertEqual(served, rollup)
+
+    def test_availability_ranks_exact_group_first(self):
+        self.verify('KEM', 'A+', 2)
+        self.verify('Ruby Hall', 'O-', 3)
+        self.verify('Ruby Hall', 'A-', 1)
+        self.verify('Sassoon', 'B+', 5)
+        rows = self.client.get('/api/inventory/availability/', {'bloodGroup': 'A+', 'units': 2}).json()
+        self.assertEqual([(r['center'], r['total_units']) for r in rows], [('KEM', 2.0), ('Ruby Hall', 4.0)])
+        self.assertEqual(inventory.suppliers('O-', 4), [])
+        self.assertEqual(self.client.get('/api/inventory/availability/', {'bloodGroup': 'C'}).status_code, 400)
+
+    def test_non_finite_or_non_positive_units_are_rejected(self):
+        self.verify('KEM', 'A+', 2)
+        for units in ('nan', 'inf', '-inf', '0', '-1', 'x'):
+            with self.subTest(units=units):
+                self.assertEqual(self.issue(center='KEM', bloodGroup='A+', units=units).status_code, 400)
+                response = self.client.get('/api/inventory/availability/', {'bloodGroup': 'A+', 'units': units})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(), {('KEM', 'A+'): 2.0})
+
+class ArchiveRecordsTests(TestCase):
+    def setUp(self):
+        old = timezone.now() - timedelta(days=400)
+        self.donor = User.objects.create_user(username='donor@example.com', password='pw')
+        for status in ('FULFILLED', 'FULFILLED', 'PENDING'):
+            r = BloodRequest.objects.create(patient_name='P', blood_group='A+', hospital='H', city='C',
+                                            contact_number='1', status=status)
+            BloodRequest.objects.filter(pk=r.pk).update(created_at=old)
+        BloodRequest.objects.create(patient_name='New', blood_group='A+', hospital='H', city='C',
+                                    contact_number='1', status='FULFILLED')
+        for verified in (True, False):
+            d = Donation.objects.create(donor=self.donor, units=1, blood_group='A+', is_verified=verified)
+            Donation.objects.filter(pk=d.pk).update(donation_date=old)
+
+    def test_moves_only_old_closed_records(self):
+        call_command('archive_records', days=365, chunk_size=1, stdout=io.StringIO())
+        self.assertEqual(ArchivedBloodRequest.objects.count(), 2)
+        self.assertEqual(BloodRequest.objects.count(), 2)
+        self.assertEqual(ArchivedDonation.objects.count(), 1)
+        self.assertEqual(Donation.objects.get().is_verified, False)
+
+    def test_listings_read_archive_only_when_asked(self):
+        call_command('archive_records', stdout=io.StringIO())
+        self.assertEqual(len(self.client.get('/api/all-requests/').json()), 2)
+        page = self.client.get('/api/all-requests/?archived=1&limit=3').json()
+        self.assertEqual(len(page['results']), 3)
+        self.assertEqual(page['results'][0]['patient_name'], 'New')
+        rest = self.client.get(f"/api/all-requests/?archived=1&limit=3&cursor={quote(page['next'])}").json()
+        self.assertEqual((len(rest['results']), rest['next']), (1, None))
+        ids = [r['id'] for r in page['results'] + rest['results']]
+        self.assertEqual(len(set(ids)), 4)
+
+    @override_settings(ARCHIVE_PAGE_SIZE=2)
+    def test_archived_listing_is_always_paged(self):
+        call_command('archive_records', stdout=io.StringIO())
+        page = self.client.get('/api/all-requests/?archived=1').json()
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNotNone(page['next'])
+        self.assertEqual(self.client.get('/api/all-requests/?archived=1&cursor=bad').status_code, 400)
+
+        self.client.force_login(self.donor)
+        self.assertEqual(len(self.client.get('/api/my-donations/').json()), 1)
+        self.assertEqual(len(self.client.get('/api/my-donations/?archived=true').json()), 2)
+
+
+
+
+@override_settings(RATE_LIMIT_CACHE='default', RATE_LIMITS={})
+class DuplicateRequestTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+
+    def submit(self, name='Ravi Sharma', phone='98765 43210', **extra):
+        data = {'patientName': name, 'bloodGroup': 'B+', 'hospital': 'Ruby Hall', 'city': 'Pune',
+                'contactNumber': phone, 'urgency': 'medium', **extra}
+        return self.client.post('/api/request-blood/', json.dumps(data), content_type='application/json').json()
+
+    def test_resubmission_is_flagged_against_the_original(self):
+        original = self.submit()['id']
+        self.assertEqual(self.submit(name='Mr. RAVI  sharma', phone='+91 9876543210')['duplicateOf'], original)
+        self.assertEqual(self.submit(name='Ravi Sharma', phone='99999 00000')['duplicateOf'], None)
+        flags = [r['duplicate_of'] for r in self.client.get('/api/all-requests/').json()]
+        self.assertEqual(flags, [None, original, None])
+
+    def test_window_bounds_the_match(self):
+        original = self.submit()['id']
+        BloodRequest.objects.filter(id=original).update(created_at=timezone.now() - timedelta(hours=73))
+        self.assertIsNone(self.submit()['duplicateOf'])
+
+    def test_archiving_the_original_keeps_its_duplicates_flagged(self):
+        original = self.submit()['id']
+        duplicate = self.submit()['id']
+        BloodRequest.objects.filter(id=original).update(status='FULFILLED', created_at=timezone.now() - timedelta(days=400))
+        call_command('archive_records', stdout=io.StringIO())
+        self.assertEqual(BloodRequest.objects.get(id=duplicate).duplicate_of_id, original)
+        archived = ArchivedBloodRequest.objects.get(id=original)
+        self.assertEqual(archived.dedupe_key, BloodRequest.objects.get(id=duplicate).dedupe_key)
+        self.assertIsNone(archived.duplicate_of_id)
+
+    def test_command_flags_the_backlog(self):
+        start = timezone.now() - timedelta(days=30)
+        for hours, name in ((0, 'Asha Rao'), (5, 'asha rao'), (80, 'Asha Rao'), (81, 'Dr Asha Rao'), (1, 'Someone Else')):
+            r = BloodRequest.objects.create(patient_name=name, blood_group='O+', hospital='KEM', city='Pune',
+                                            contact_number='020-1234567')
+            BloodRequest.objects.filter(pk=r.pk).update(created_at=start + timedelta(hours=hours))
+        call_command('dedupe_requests', chunk_size=2, stdout=io.StringIO())
+
+        rows = BloodRequest.objects.order_by('created_at')
+        by_name = [(r.patient_name, r.duplicate_of.created_at - start if r.duplicate_of else None) for r in rows]
+        self.assertEqual(by_name, [
+            ('Asha Rao', None), ('Someone Else', None), ('asha rao', timedelta(0)),
+            ('Asha Rao', None), ('Dr Asha Rao', timedelta(hours=80)),
+        ])
+        self.assertEqual(BloodRequest.objects.exclude(dedupe_key=dedupe.key_for(rows[0])).count(), 1)
+
+class ExportAnalyticsTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.old = timezone.now() - timedelta(days=1)
+        self.donor = User.objects.create(username='donor@example.com')
+        DonorProfile.objects.create(user=self.donor, blood_group='O-', city='Pune', registered_at=self.old)
+        DonorProfile.objects.update(created_at=self.old)
+        self.request('A+')
+        self.donation('B+')
+
+    def request(self, blood_group, created_at=None):
+        r = BloodRequest.objects.create(patient_name='P', blood_group=blood_group, hospital='H', city='Pune',
+                                        contact_number='1')
+        BloodRequest.objects.filter(pk=r.pk).update(created_at=created_at or self.old)
+
+    def donation(self, blood_group, verified_at=None):
+        Donation.objects.create(donor=self.donor, units=1.5, blood_group=blood_group, center='KEM',
+                                is_verified=True, verified_at=verified_at or self.old)
+
+    def export(self, **options):
+        call_command('export_analytics', out=self.tmp.name, stdout=io.StringIO(), **options)
+        with open(os.path.join(self.tmp.name, 'manifest.json')) as f:
+            return json.load(f)
+
+    def column(self, manifest, table, column):
+        np = export_analytics.np
+        return np.concatenate([np.load(os.path.join(self.tmp.name, seg['path'], f'{column}.npy'), mmap_mode='r')
+                               for seg in manifest['tables'][table]['segments']])
+
+    @unittest.skipIf(export_analytics.np is None, 'numpy is not installed')
+    def test_incremental_export_appends_segments(self):
+        first = self.export(lag_minutes=0)
+        self.assertEqual({t: s['rows'] for t, s in first['tables'].items()}, {'donations': 1, 'requests': 1, 'donors': 1})
+
+        self.request('O-', created_at=timezone.now())
+        self.request('AB+', created_at=timezone.now() + timedelta(hours=1))  # not yet inside any window
+        self.donation('A+', verified_at=timezone.now())
+        second = self.export(lag_minutes=0)
+        self.assertEqual([len(second['tables'][t]['segments']) for t in ('donations', 'requests', 'donors')], [2, 2, 1])
+
+        groups = second['dictionaries']['blood_group']
+        self.assertEqual([groups[c] for c in self.column(second, 'requests', 'blood_group')], ['A+', 'O-'])
+        self.assertEqual(self.column(second, 'donations', 'units').sum(), 3.0)
+        self.assertEqual(self.column(second, 'donations', 'blood_group').dtype.name, 'uint8')
+
+        rebuilt = self.export(rebuild=True)
+        self.assertEqual([len(rebuilt['tables'][t]['segments']) for t in ('donations', 'requests', 'donors')], [1, 1, 1])
+
+    @unittest.skipIf(export_analytics.np is None, 'numpy is not installed')
+    def test_profiles_created_late_are_still_exported(self):
+        self.export(lag_minutes=0)
+        joined = timezone.now() - timedelta(days=30)
+        late = User.objects.create(username='late@example.com', date_joined=joined)
+        DonorProfile.objects.create(user=late, registered_at=joined)
+        second = self.export(lag_minutes=0)
+        self.assertEqual(second['tables']['donors']['rows'], 2)
+
+    def test_reports_rows_without_a_cursor(self):
+        Donation.objects.create(donor=self.donor, units=1, blood_group='A+', is_verified=True)
+        err = io.StringIO()
+        with mock.patch.object(export_analytics.Command, 'export', return_value=0):
+            call_command('export_analytics', out=self.tmp.name, stdout=io.StringIO(), stderr=err)
+        self.assertIn('donations: 1 rows have no verified_at', err.getvalue())
+
+    def test_requires_numpy(self):
+        with mock.patch.object(export_analytics, 'np', None):
+            with self.assertRaisesMessage(CommandError, 'numpy'):
+                call_command('export_analytics', out=self.tmp.name)
+
+class DonorSummaryTests(TestCase):
+    def setUp(self):
+        self.donor = User.objects.create_user(username='donor@example.com', password='pw')
+        self.client.force_login(self.donor)
+
+    def donate(self, units):
+        return self.client.post('/api/donate/', json.dumps({'units': units, 'bloodGroup': 'A+'}),
+                                content_type='application/json').json()['id']
+
+    def verify(self, donation_id, action='approve'):
+        self.client.post('/api/admin/donations/verify/', json.dumps(
+            {'donationId': donation_id, 'action': action}), content_type='application/json')
+
+    def test_summary_tracks_log_verify_and_reject(self):
+        first = self.donate('1.0')
+        second = self.donate('2.0')
+        self.verify(first)
+        self.verify(first)  # double-submitted approval counts once
+        self.verify(second, 'reject')
+        self.donate('0.5')
+
+        with self.assertNumQueries(3):  # session, user, summary row
+            s = self.client.get('/api/my-donations/summary/').json()
+        self.assertEqual(s['donation_count'], 2)
+        self.assertEqual(s['verified_count'], 1)
+        self.assertEqual(s['units_verified'], 1.0)
+        self.assertEqual(s['units_pending'], 0.5)
+        self.assertIsNotNone(s['last_verified_at'])
+
+    def test_rejecting_a_verified_donation_keeps_archived_verifications(self):
+        archived_at = timezone.now() - timedelta(days=400)
+        ArchivedDonation.objects.create(id=1000, donor=self.donor, units=1, blood_group='A+',
+                                        donation_date=archived_at, verified_at=archived_at)
+        d = Donation.objects.create(donor=self.donor, units=1, blood_group='A+', is_verified=True,
+                                    verified_at=timezone.now())
+        summary.donation_logged(d)
+        summary.donation_verified(d)
+        d.delete()
+        summary.donation_rejected(d)
+        self.assertEqual(summary.summary_for(self.donor.id)['last_verified_at'], archived_at.isoformat())
+
+    def test_staff_lookup_rejects_a_malformed_donor_id(self):
+        self.client.force_login(User.objects.create(username='admin@example.com', is_staff=True))
+        self.assertEqual(self.client.get('/api/my-donations/?donor=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/my-donations/summary/?donor=abc').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/my-donations/summary/?donor={self.donor.id}').status_code, 200)
+
+    def test_history_keyset_pagination(self):
+        for _ in range(5):
+            self.donate('1.0')
+        seen, cursor = [], None
+        while True:
+            url = '/api/my-donations/?limit=2' + (f'&cursor={quote(cursor)}' if cursor else '')
+            page = self.client.get(url).json()
+            seen += [row['id'] for row in page['results']]
+            self.assertEqual(page['summary']['donation_count'], 5)
+            cursor = page['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(Donation.objects.values_list('id', flat=True), reverse=True))
+
+    def test_unpaginated_history_is_unchanged(self):
+        self.donate('1.0')
+        self.assertIsInstance(self.client.get('/api/my-donations/').json(), list)
+
+
+@override_settings(BROADCAST_RATE=None, BROADCAST_BATCH_SIZE=2, RATE_LIMIT_CACHE='default')
+class CriticalBroadcastTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.donors = {}
+        profiles = [
+            ('o_neg', 'O-', 'Pune', True, None),
+            ('a_pos', 'A+', 'Pune', True, None),
+            ('a_neg', 'A-', 'Pune', True, None),
+            ('b_pos', 'B+', 'Pune', True, None),  # incompatible with A+
+            ('other_city', 'A+', 'Delhi', True, None),
+            ('ineligible', 'A+', 'Pune', False, None),
+            ('recent', 'A+', 'Pune', True, timezone.now().date() - timedelta(days=10)),
+        ]
+        for name, group, city, eligible, last in profiles:
+            user = User.objects.create(username=name, email=f'{name}@example.com')
+            DonorProfile.objects.create(user=user, blood_group=group, city=city,
+                                        is_eligible=eligible, last_donation_date=last)
+            self.donors[name] = user
+
+    def make_request(self, **kwargs):
+        fields = dict(patient_name='P', blood_group='A+', hospital='H', city='Pune',
+                      contact_number='1', urgency='critical')
+        fields.update(kwargs)
+        return BloodRequest.objects.create(**fields)
+
+    def test_alerts_only_compatible_eligible_local_donors(self):
+        self.assertEqual(broadcast(self.make_request().id), 3)
+        recipients = sorted(m.to[0] for m in mail.outbox)
+        self.assertEqual(recipients, ['a_neg@example.com', 'a_pos@example.com', 'o_neg@example.com'])
+
+    def test_rerun_and_cooldown_do_not_realert(self):
+        first = self.make_request()
+        broadcast(first.id)
+        self.assertEqual(broadcast(first.id), 0)
+        self.assertEqual(broadcast(self.make_request().id), 0)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failed_send_leaves_donors_to_alert_again(self):
+        blood_request = self.make_request()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError):
+            with self.assertRaises(OSError):
+                broadcast(blood_request.id)
+        self.assertFalse(DonorNotification.objects.exists())
+        self.assertEqual(broadcast(blood_request.id), 3)
+
+    def test_non_critical_requests_are_not_broadcast(self):
+        self.assertEqual(broadcast(self.make_request(urgency='medium').id), 0)
+
+    @override_settings(BROADCAST_SYNC=True)
+    def test_request_view_enqueues_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/request-blood/', json.dumps({
+                'patientName': 'P', 'bloodGroup': 'O-', 'hospital': 'H', 'city': 'Pune',
+                'contactNumber': '1', 'urgency': 'critical',
+            }), content_type='application/json')
+        self.assertEqual([m.to[0] for m in mail.outbox], ['o_neg@example.com'])
+
+
+@override_settings(DONOR_COUNT_CACHE='default', RATE_LIMIT_CACHE='default')
+class DonorDirectoryTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        start = timezone.now() - timedelta(days=10)
+        for i in range(6):
+            user = User.objects.create(username=f'donor{i}@example.com')
+            DonorProfile.objects.create(user=user, blood_group=('A+', 'O-')[i % 2], city=('Pune', 'Delhi')[i % 3 == 0],
+                                        is_eligible=i < 4, registered_at=start + timedelta(days=i))
+
+    def get(self, **params):
+        return self.client.get('/api/admin/donors/', params)
+
+    def test_without_limit_returns_filtered_list(self):
+        rows = self.get(blood_group='A+', eligible='true').json()
+        self.assertEqual([r['full_name'] for r in rows], ['donor2@example.com', 'donor0@example.com'])
+
+    def test_cursor_pages_cover_every_row_once(self):
+        seen, cursor = [], ''
+        while True:
+            page = self.get(limit=4, sort='registered_at', cursor=cursor).json()
+            self.assertEqual(page['total'], 6)
+            seen += [r['full_name'] for r in page['results']]
+            cursor = page['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, [f'donor{i}@example.com' for i in range(6)])
+
+    def test_offset_and_date_range(self):
+        first = timezone.localdate(timezone.now() - timedelta(days=9)).isoformat()
+        last = timezone.localdate(timezone.now() - timedelta(days=7)).isoformat()
+        page = self.get(limit=2, offset=1, registered_from=first, registered_to=last).json()
+        self.assertEqual([r['full_name'] for r in page['results']], ['donor2@example.com', 'donor1@example.com'])
+        self.assertEqual((page['total'], page['next']), (3, None))
+
+    def test_total_is_cached_per_filter(self):
+        self.assertEqual(self.get(limit=1, city='Pune').json()['total'], 4)
+        DonorProfile.objects.filter(city='Pune').first().delete()
+        self.assertEqual(self.get(limit=1, city='Pune').json()['total'], 4)
+        self.assertEqual(self.get(limit=1, city='Pune', eligible='no').json()['total'], 2)
+
+    def test_bad_params_are_rejected(self):
+        cases = (
+            ({'sort': 'email'}, 'sort must be one of'), ({'eligible': 'maybe'}, 'eligible must be true or false'),
+            ({'registered_from': 'soon'}, 'Invalid date: soon'), ({'registered_to': '2024-13-01'}, 'Invalid date'),
+            ({'limit': 'x'}, 'Invalid limit, offset or cursor'), ({'limit': '5', 'cursor': 'abc'}, 'Invalid limit'),
+        )
+        for params, message in cases:
+            with self.subTest(params=params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(message, response.json()['error'])
+
+
+@override_settings(RATE_LIMIT_CACHE='default')
+class AppointmentTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.donor = User.objects.create(username='donor@example.com')
+        self.client.force_login(self.donor)
+        soon = timezone.now() + timedelta(days=1)
+        self.slot = DonationSlot.objects.create(center='City', starts_at=soon, capacity=1)
+        self.other = DonationSlot.objects.create(center='Ruby Hall', starts_at=soon, capacity=2)
+
+    def post(self, path, **data):
+        return self.client.post(path, json.dumps(data), content_type='application/json')
+
+    def test_book_until_full_then_cancel_frees_the_place(self):
+        booked = self.post('/api/slots/book/', slotId=self.slot.id)
+        self.assertEqual(booked.status_code, 200)
+        self.assertEqual(self.post('/api/slots/book/', slotId=self.slot.id).status_code, 409)
+        self.assertEqual([s['id'] for s in self.client.get('/api/slots/').json()], [self.other.id])
+        self.assertEqual([a['slot']['id'] for a in self.client.get('/api/appointments/').json()], [self.slot.id])
+
+        appointment_id = booked.json()['id']
+        self.assertEqual(self.post('/api/appointments/cancel/', appointmentId=appointment_id).status_code, 200)
+        self.assertEqual(self.post('/api/appointments/cancel/', appointmentId=appointment_id).status_code, 404)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.booked, 0)
+
+    def test_duplicate_booking_does_not_take_a_second_place(self):
+        self.assertEqual(self.post('/api/slots/book/', slotId=self.other.id).status_code, 200)
+        self.assertEqual(self.post('/api/slots/book/', slotId=self.other.id).json(), {'error': 'You already have this slot'})
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.booked, 1)
+
+    def test_availability_filters_by_center_and_skips_past_slots(self):
+        DonationSlot.objects.create(center='City', starts_at=timezone.now() - timedelta(hours=1), capacity=5)
+        rows = self.client.get('/api/slots/', {'center': 'City'}).json()
+        self.assertEqual([(r['id'], r['remaining']) for r in rows], [(self.slot.id, 1)])
+        self.assertEqual(self.post('/api/slots/book/', slotId=999).status_code, 404)
+
+    def test_non_object_bodies_are_rejected(self):
+        for path in ('/api/slots/book/', '/api/appointments/cancel/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.post(path, '[1]', content_type='application/json').status_code, 400)
+
+    def test_only_staff_create_slots(self):
+        data = {'center': 'City', 'startsAt': '2030-01-01T09:00:00Z', 'capacity': 4}
+        self.assertEqual(self.post('/api/admin/slots/', **data).status_code, 401)
+        self.client.force_login(User.objects.create(username='admin@example.com', is_staff=True))
+        self.assertEqual(self.post('/api/admin/slots/', **data).json()['remaining'], 4)
+        self.assertEqual(self.post('/api/admin/slots/', **data).status_code, 409)
+        for capacity in (0, -3):
+            response = self.post('/api/admin/slots/', **{**data, 'startsAt': '2031-01-01T09:00:00Z', 'capacity': capacity})
+            self.assertEqual(response.status_code, 400)
+
+
+class AppointmentStressTests(TransactionTestCase):
+    DONORS = 200
+    CAPACITY = 15
+
+    def test_concurrent_bookings_never_overbook(self):
+        slot = DonationSlot.objects.create(center='City', starts_at=timezone.now() + timedelta(days=1),
+                                           capacity=self.CAPACITY)
+        donors = User.objects.bulk_create([User(username=f'donor{i}@example.com') for i in range(self.DONORS)])
+
+        def book(donor):
+            try:
+                while True:
+                    try:
+                        return appointments.book(donor, slot.id)[0]
+                    except OperationalError:
+                        # The in-memory test database runs in SQLite shared-cache mode, which reports a
+                        # held write lock immediately instead of waiting out the busy timeout like a file
+                        time.sleep(0.001)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            outcomes = list(pool.map(book, donors))
+
+        slot.refresh_from_db()
+        self.assertEqual(outcomes.count(appointments.BOOKED), self.CAPACITY)
+        self.assertEqual(outcomes.count(appointments.FULL), self.DONORS - self.CAPACITY)
+        self.assertEqual((slot.booked, slot.appointments.count()), (self.CAPACITY, self.CAPACITY))
+
+
+
+class StructuredLoggingTests(TestCase):
+    def handler(self, stream, maxsize=100):
+        handler = logs.BackgroundHandler(stream=stream, maxsize=maxsize)
+        handler.addFilter(logs.RequestIdFilter())
+        handler.addFilter(logs.SamplingFilter())
+        self.addCleanup(handler.close)
+        logger = logging.getLogger(f'web.test.{self._testMethodName}')
+        logger.propagate = False
+        logger.addHandler(handler)
+        return handler, logger
+
+    def test_records_are_written_as_json_lines_with_the_request_id(self):
+        stream = io.StringIO()
+        handler, logger = self.handler(stream)
+        token = logs.request_id.set('abc123')
+        try:
+            logger.info('donation_logged', extra={'units': 1.5})
+            try:
+                1 / 0
+            except ZeroDivisionError:
+                logger.exception('request_failed')
+        finally:
+            logs.request_id.reset(token)
+        handler.stop()
+
+        first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual((first['event'], first['request_id'], first['units']), ('donation_logged', 'abc123', 1.5))
+        self.assertIn('ZeroDivisionError', second['exc'])
+
+    def test_destination_follows_log_stream(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'app.log')
+            with override_settings(LOG_STREAM=path):
+                handler = logs.BackgroundHandler(maxsize=10)
+            handler.handle(logging.makeLogRecord({'name': 'web', 'msg': 'to_file', 'levelno': logging.INFO}))
+            handler.close()
+            with open(path) as f:
+                self.assertEqual(json.loads(f.read())['event'], 'to_file')
+        with override_settings(LOG_STREAM=None):
+            self.assertIsInstance(logs.BackgroundHandler(maxsize=10).target, logging.NullHandler)
+
+    @override_settings(LOG_SAMPLE_RATES={'noisy': 0.0})
+    def test_sampling_drops_info_but_keeps_warnings(self):
+        stream = io.StringIO()
+        handler, logger = self.handler(stream)
+        logger.info('noisy')
+        logger.warning('noisy')
+        logger.info('quiet')
+        handler.stop()
+        events = [(e['level'], e['event']) for e in map(json.loads, stream.getvalue().splitlines())]
+        self.assertEqual(events, [('warning', 'noisy'), ('info', 'quiet')])
+
+    def test_a_stalled_writer_drops_records_instead_of_blocking(self):
+        release = threading.Event()
+
+        class StalledStream(io.StringIO):
+            def write(self, text):
+                release.wait()
+                return super().write(text)
+
+        handler, logger = self.handler(StalledStream(), maxsize=2)
+        started = time.perf_counter()
+        for _ in range(50):
+            logger.info('burst')
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertGreater(handler.dropped, 0)
+        release.set()
+
+    def test_middleware_sets_and_echoes_request_ids(self):
+        minted = self.client.get('/api/csrf/')['X-Request-ID']
+        self.assertRegex(minted, r'^[0-9a-f]{32}$')
+        self.assertEqual(self.client.get('/api/csrf/', HTTP_X_REQUEST_ID='edge-42')['X-Request-ID'], 'edge-42')
+        self.assertNotEqual(self.client.get('/api/csrf/', HTTP_X_REQUEST_ID='bad id\n')['X-Request-ID'], 'bad id\n')
+
+    def test_view_errors_are_logged(self):
+        self.client.force_login(User.objects.create(username='donor@example.com'))
+        with self.assertLogs('web.views', 'WARNING') as captured:
+            self.client.post('/api/donate/', 'not json', content_type='application/json')
+        self.assertEqual(captured.records[0].view, 'LogDonationView')
+
+class RequestLifecycleTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create(username='admin@example.com', is_staff=True)
+
+    def create(self, minutes_ago=0, urgency='medium', **fields):
+        r = BloodRequest.objects.create(patient_name='P', blood_group='A+', hospital='H', city='Pune',
+                                        contact_number='1', urgency=urgency, **fields)
+        BloodRequest.objects.filter(pk=r.pk).update(created_at=timezone.now() - timedelta(minutes=minutes_ago))
+        r.refresh_from_db()
+        return r
+
+    def test_transitions_stamp_the_request_and_record_history(self):
+        r = self.create(minutes_ago=30)
+        self.assertTrue(lifecycle.transition(r, 'ALLOCATED', by=self.admin))
+        self.assertFalse(lifecycle.transition(r, 'ALLOCATED'))
+        self.assertTrue(lifecycle.transition(r, 'FULFILLED'))
+        r.refresh_from_db()
+        self.assertLessEqual(r.allocated_at, r.fulfilled_at)
+        history = RequestStatusChange.objects.filter(blood_request=r).order_by('changed_at', 'id')
+        self.assertEqual([(h.from_status, h.to_status, h.changed_by_id) for h in history],
+                         [('PENDING', 'ALLOCATED', self.admin.id), ('ALLOCATED', 'FULFILLED', None)])
+        self.assertEqual(lifecycle.sla()['all']['fulfil']['count'], 1)
+        with self.assertRaises(ValueError):
+            lifecycle.transition(r, 'LOST')
+
+    def test_fulfilling_directly_counts_as_allocated_too(self):
+        r = self.create(minutes_ago=10)
+        lifecycle.transition(r, 'FULFILLED')
+        r.refresh_from_db()
+        self.assertEqual(r.allocated_at, r.fulfilled_at)
+        groups = lifecycle.sla('urgency')['medium']
+        self.assertEqual((groups['allocate']['count'], groups['fulfil']['count']), (1, 1))
+
+    def test_stale_transition_is_not_recorded(self):
+        r = self.create()
+        BloodRequest.objects.filter(pk=r.pk).update(status='FULFILLED')
+        self.assertFalse(lifecycle.transition(r, 'ALLOCATED'))
+        self.assertFalse(RequestStatusChange.objects.exists())
+
+    def test_percentiles_stay_within_a_bucket(self):
+        for minutes in [5] * 50 + [60] * 40 + [600] * 10:
+            lifecycle.transition(self.create(minutes_ago=minutes, urgency='critical'), 'ALLOCATED')
+        lifecycle.transition(self.create(minutes_ago=1000), 'ALLOCATED')
+        allocate = lifecycle.sla('urgency')['critical']['allocate']
+        self.assertEqual(allocate['count'], 100)
+        for p, minutes in (('p50', 5), ('p90', 60), ('p99', 600)):
+            self.assertAlmostEqual(allocate[p] / (minutes * 60), 1, delta=0.1)
+        self.assertIsNone(lifecycle.sla('city')['Pune']['fulfil']['p50'])
+
+    def test_allocate_view_records_the_transition(self):
+        r = self.create(minutes_ago=20)
+        donor = User.objects.create(username='donor@example.com')
+        self.client.force_login(self.admin)
+        post = lambda status: self.client.post('/api/allocate-donor/', json.dumps({
+            'requestId': r.id, 'donorId': donor.id, 'status': status}), content_type='application/json')
+        self.assertEqual(post('nonsense').status_code, 400)
+        self.assertEqual(post('allocated').status_code, 200)
+        row = self.client.get('/api/all-requests/').json()[0]
+        self.assertEqual((row['status'], row['assigned_donor_id'], row['fulfilled_at']), ('allocated', str(donor.id), None))
+        self.assertIsNotNone(row['allocated_at'])
+        self.assertEqual(RequestStatusChange.objects.get().changed_by, self.admin)
+
+    def test_dashboard_approve_and_reject(self):
+        approved, rejected = self.create(minutes_ago=15), self.create(minutes_ago=15)
+        donor = User.objects.create(username='donor@example.com')
+        self.client.force_login(self.admin)
+        post = lambda r, status, donor_id=None: self.client.post('/api/allocate-donor/', json.dumps({
+            'requestId': r.id, 'donorId': donor_id, 'status': status}), content_type='application/json')
+
+        self.assertEqual(post(approved, 'approved', donor.id).status_code, 200)
+        self.assertEqual(post(rejected, 'rejected').status_code, 200)
+        self.assertEqual(post(rejected, 'rejected').status_code, 200)  # a retried click is harmless
+        self.assertEqual(post(rejected, 'approved', donor.id).status_code, 409)
+
+        statuses = {r['id']: (r['status'], r['allocated_at'] is not None) for r in self.client.get('/api/all-requests/').json()}
+        self.assertEqual(statuses, {approved.id: ('approved', True), rejected.id: ('rejected', False)})
+        allocate = lifecycle.sla('urgency')['medium']['allocate']
+        self.assertEqual(allocate['count'], 1)
+        self.assertAlmostEqual(allocate['p50'] / (15 * 60), 1, delta=0.1)
+
+    def test_sla_endpoint_is_staff_only(self):
+        lifecycle.transition(self.create(minutes_ago=5, urgency='low'), 'ALLOCATED')
+        self.assertEqual(self.client.get('/api/admin/sla/').status_code, 401)
+        self.client.force_login(self.admin)
+        body = self.client.get('/api/admin/sla/?by=urgency').json()
+        self.assertEqual(body['by'], 'urgency')
+        self.assertEqual(body['groups']['low']['allocate']['count'], 1)
+        self.assertEqual(self.client.get('/api/admin/sla/?by=hospital').status_code, 400)
@@ -1,19 +1,57 @@
+import heapq
+import itertools
 import json
+import logging
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 from django.utils import timezone
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
-from django.http import JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_exempt
 from django.views.decorators.http import require_POST, require_GET
 from django.utils.decorators import method_decorator
-from django.views.generic import TemplateView
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
 from django.views import View
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.core.mail import send_mail
 from django.conf import settings
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import BloodRequest, Donation, Inventory, DonorProfile
+from .models import (
+    BloodRequest, Donation, DonorProfile, ArchivedBloodRequest, ArchivedDonation, DonationSlot, Appointment,
+)
+from . import appointments, dedupe, directory, inventory, lifecycle, summary
+from .broadcast import broadcast_worker
+from .responses import FastJsonResponse, requested_fields, sparse
+from .snapshot import inventory_snapshot
+from .spa import shell_cache, etag_for, not_modified, pick_encoding
 
+log = logging.getLogger(__name__)
+
+
+def donor_for(request):
+    # Donors see their own history; staff may look at anyone's with ?donor=<id>.
+    # Raises ValueError if <id> isn't an integer.
+    donor_id = request.GET.get('donor')
+    if not donor_id or int(donor_id) == request.user.id:
+        return request.user
+    if not request.user.is_staff:
+        return None
+    return User.objects.filter(id=donor_id).first()
+
+
+def before_cursor(cursor, field='donation_date'):
+    # Cursor is "<field iso>|<id>" of the last row on the previous page
+    date, _, last_id = cursor.rpartition('|')
+    date = datetime.fromisoformat(date)
+    return Q(**{f'{field}__lt': date}) | Q(**{field: date, 'id__lt': int(last_id)})
+
+
+def include_archived(request):
+    # Listings read only the hot tables unless the caller asks for history
+    return request.GET.get('archived', '').lower() in ('1', 'true', 'yes')
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -24,28 +62,31 @@ class LogDonationView(View):
             user = request.user
             
             if not user.is_authenticated:
-                return JsonResponse({'error': 'Unauthorized'}, status=401)
+                return FastJsonResponse({'error': 'Unauthorized'}, status=401)
                 
-            donation = Donation.objects.create(
-                donor=user,
-                units=data.get('units'),
-                blood_group=data.get('bloodGroup'),
-                center=data.get('center', ''),
-                is_verified=False 
-            )
+            with transaction.atomic():
+                donation = Donation.objects.create(
+                    donor=user,
+                    units=data.get('units'),
+                    blood_group=data.get('bloodGroup'),
+                    center=data.get('center', ''),
+                    is_verified=False 
+                )
+                summary.donation_logged(donation)
             
             # Inventory update REMOVED. Now happens on verification.
             
-            return JsonResponse({'success': True, 'id': donation.id})
-        except Exception as e:
-            return JsonResponse({'error': 'Request failed'}, status=400)
+            return FastJsonResponse({'success': True, 'id': donation.id})
+        except Exception:
+            log.warning('request_failed', exc_info=True, extra={'view': type(self).__name__})
+            return FastJsonResponse({'error': 'Request failed'}, status=400)
 
 class GetPendingDonationsView(View):
     def get(self, request):
         # Admin check
-        # if not request.user.is_staff: return JsonResponse({'error': 'Forbidden'}, status=403)
+        # if not request.user.is_staff: return FastJsonResponse({'error': 'Forbidden'}, status=403)
         
-        pending_donations = Donation.objects.filter(is_verified=False).order_by('-donation_date')
+        pending_donations = Donation.objects.filter(is_verified=False).order_by('-donation_date').select_related('donor')
         data = []
         for d in pending_donations:
             data.append({
@@ -59,7 +100,7 @@ class GetPendingDonationsView(View):
                 'is_verified': d.is_verified,
                 'collected_by': 'Admin' # Default
             })
-        return JsonResponse(data, safe=False)
+        return FastJsonResponse(sparse(data, requested_fields(request)), safe=False)
 
 @method_decorator(csrf_exempt, name='dispatch')
 class VerifyDonationView(View):
@@ -72,40 +113,77 @@ class VerifyDonationView(View):
             donation = Donation.objects.get(id=donation_id)
             
             if action == 'approve':
-                donation.is_verified = True
-                donation.verified_at = timezone.now()
-                if request.user.is_authenticated:
-                    donation.verified_by = request.user
-                donation.save()
-                
-                # Update Inventory
-                inventory, created = Inventory.objects.get_or_create(blood_group=donation.blood_group)
-                # Ensure we handle Decimal conversions if needed, though Python handles mixing well usually.
-                # But safer to match types
-                inventory.units_available = float(inventory.units_available) + float(donation.units)
-                inventory.save()
+                with transaction.atomic():
+                    donation.verified_at = timezone.now()
+                    donation.verified_by = request.user if request.user.is_authenticated else None
+                    # Conditional update so a double-submitted approval is only counted once
+                    approved = Donation.objects.filter(id=donation.id, is_verified=False).update(
+                        is_verified=True, verified_at=donation.verified_at, verified_by=donation.verified_by
+                    )
+                    if approved:
+                        donation.is_verified = True
+                        
+                        # Update the collecting center's stock and the global rollup
+                        inventory.receive(donation.center, donation.blood_group, donation.units)
+                        
+                        summary.donation_verified(donation)
                 
             elif action == 'reject':
-                donation.delete() # Simple rejection logic
+                with transaction.atomic():
+                    deleted, _ = Donation.objects.filter(id=donation.id).delete() # Simple rejection logic
+                    if deleted:
+                        summary.donation_rejected(donation)
                 
-            return JsonResponse({'success': True})
+            return FastJsonResponse({'success': True})
         except Donation.DoesNotExist:
-            return JsonResponse({'error': 'Donation not found'}, status=404)
-        except Exception as e:
-            return JsonResponse({'error': 'Request failed'}, status=400)
+            return FastJsonResponse({'error': 'Donation not found'}, status=404)
+        except Exception:
+            log.warning('request_failed', exc_info=True, extra={'view': type(self).__name__})
+            return FastJsonResponse({'error': 'Request failed'}, status=400)
 
 class DonorHistoryView(View):
     def get(self, request):
         if not request.user.is_authenticated:
-            return JsonResponse({'error': 'Unauthorized'}, status=401)
-            
-        donations = Donation.objects.filter(donor=request.user).order_by('-donation_date')
+            return FastJsonResponse({'error': 'Unauthorized'}, status=401)
+        
+        try:
+            donor = donor_for(request)
+        except ValueError:
+            return FastJsonResponse({'error': 'Invalid donor'}, status=400)
+        if donor is None:
+            return FastJsonResponse({'error': 'Forbidden'}, status=403)
+        
+        donations = Donation.objects.filter(donor=donor)
+        archived = ArchivedDonation.objects.filter(donor=donor) if include_archived(request) else None
+        
+        # ?limit= switches to keyset pagination: {'results', 'next', 'summary'}
+        try:
+            limit = int(request.GET.get('limit') or 0)
+            before = before_cursor(request.GET['cursor']) if request.GET.get('cursor') else None
+        except ValueError:
+            return FastJsonResponse({'error': 'Invalid limit or cursor'}, status=400)
+        if limit:
+            limit = max(1, min(limit, 100))
+            if before is not None:
+                donations = donations.filter(before)
+                archived = archived.filter(before) if archived is not None else None
+            donations = donations.order_by('-donation_date', '-id')[:limit + 1]
+            if archived is not None:
+                archived = archived.order_by('-donation_date', '-id')[:limit + 1]
+        else:
+            donations = donations.order_by('-donation_date', '-id')
+            if archived is not None:
+                archived = archived.order_by('-donation_date', '-id')
+        
+        if archived is not None:
+            donations = heapq.merge(donations, archived, key=lambda d: (d.donation_date, d.id), reverse=True)
+        
         data = []
         for d in donations:
             data.append({
                 'id': d.id,
-                'donor_id': str(d.donor.id),
-                'donors': {'full_name': d.donor.first_name or d.donor.username},
+                'donor_id': str(donor.id),
+                'donors': {'full_name': donor.first_name or donor.username},
                 'units_donated': float(d.units),
                 'blood_group': d.blood_group,
                 'donation_center': d.center,
@@ -113,15 +191,76 @@ class DonorHistoryView(View):
                 'is_verified': d.is_verified,
                 'collected_by': 'Staff'
             })
-        return JsonResponse(data, safe=False)
+        if not limit:
+            return FastJsonResponse(sparse(data, requested_fields(request)), safe=False)
+        
+        page, more = data[:limit], len(data) > limit
+        return FastJsonResponse({
+            'results': sparse(page, requested_fields(request)),
+            'next': f"{page[-1]['donation_date']}|{page[-1]['id']}" if more else None,
+            'summary': summary.summary_for(donor.id),
+        })
+
+class DonorSummaryView(View):
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return FastJsonResponse({'error': 'Unauthorized'}, status=401)
+        try:
+            donor = donor_for(request)
+        except ValueError:
+            return FastJsonResponse({'error': 'Invalid donor'}, status=400)
+        if donor is None:
+            return FastJsonResponse({'error': 'Forbidden'}, status=403)
+        return FastJsonResponse(summary.summary_for(donor.id))
+
 
+class ReactAppView(View):
+    # Serves the built SPA shell from memory instead of rendering it as a template
+    def get(self, request, *args, **kwargs):
+        entry = shell_cache.get()
+        if entry is None:
+            raise Http404('Frontend build not found')
 
-class ReactAppView(TemplateView):
-    template_name = "index.html"
+        encoding = pick_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), entry['variants'])
+        etag = etag_for(entry, encoding)
+        if not_modified(entry, request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(entry['variants'][encoding], content_type='text/html; charset=utf-8')
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        # Hashed assets are immutable; the shell itself must be revalidated so new builds show up
+        response['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
 
 class GetRequestsView(View):
     def get(self, request):
-        requests = BloodRequest.objects.all().order_by('-created_at')
+        requests = BloodRequest.objects.all()
+        archived = ArchivedBloodRequest.objects.all() if include_archived(request) else None
+
+        # ?limit= switches to keyset pagination: {'results', 'next'}. The archive
+        # is only ever read a page at a time, so asking for it implies a limit.
+        try:
+            limit = int(request.GET.get('limit') or 0)
+            before = before_cursor(request.GET['cursor'], 'created_at') if request.GET.get('cursor') else None
+        except ValueError:
+            return FastJsonResponse({'error': 'Invalid limit or cursor'}, status=400)
+        if archived is not None and not limit:
+            limit = getattr(settings, 'ARCHIVE_PAGE_SIZE', 50)
+        if limit:
+            limit = max(1, min(limit, 100))
+            if before is not None:
+                requests = requests.filter(before)
+                archived = archived.filter(before) if archived is not None else None
+            requests = requests.order_by('-created_at', '-id')[:limit + 1]
+            if archived is not None:
+                archived = archived.order_by('-created_at', '-id')[:limit + 1]
+                requests = heapq.merge(requests, archived, key=lambda r: (r.created_at, r.id), reverse=True)
+            requests = itertools.islice(requests, limit + 1)
+        else:
+            requests = requests.order_by('-created_at')
         data = []
         for r in requests:
             data.append({
@@ -135,9 +274,19 @@ class GetRequestsView(View):
                 'units': 1, 
                 'reason': r.additional_notes,
                 'requester_email': r.requester_email,
-                'requester_id': 'guest' 
+                'requester_id': 'guest',
+                'duplicate_of': getattr(r, 'duplicate_of_id', None),
+                'allocated_at': r.allocated_at.isoformat() if r.allocated_at else None,
+                'fulfilled_at': r.fulfilled_at.isoformat() if r.fulfilled_at else None,
             })
-        return JsonResponse(data, safe=False)
+        if not limit:
+            return FastJsonResponse(sparse(data, requested_fields(request)), safe=False)
+
+        page, more = data[:limit], len(data) > limit
+        return FastJsonResponse({
+            'results': sparse(page, requested_fields(request)),
+            'next': f"{page[-1]['created_at']}|{page[-1]['id']}" if more else None,
+        })
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -151,7 +300,11 @@ class AllocateDonorView(View):
             
             blood_request = BloodRequest.objects.get(id=request_id)
             if status:
-                blood_request.status = status.upper()
+                status = status.upper()
+                if status not in lifecycle.STATUSES:
+                    return FastJsonResponse({'error': 'Unknown status'}, status=400)
+                if blood_request.status in lifecycle.TERMINAL and status != blood_request.status:
+                    return FastJsonResponse({'error': 'Request is closed'}, status=409)
             
                 blood_request.assigned_donor_id = donor_id
                 
@@ -162,7 +315,8 @@ class AllocateDonorView(View):
                     donor_phone = ""
                     try:
                         donor_phone = donor_user.profile.phone
-                    except: pass
+                    except DonorProfile.DoesNotExist:
+                        pass
 
                     # Send Email to Requester
                     if blood_request.requester_email:
@@ -192,33 +346,79 @@ class AllocateDonorView(View):
                             [blood_request.requester_email],
                             fail_silently=False,
                         )
-                    else:
                 except User.DoesNotExist:
-                except Exception as e:
+                    log.info('allocation_unknown_donor', extra={'donor_id': donor_id})
+                except Exception:
+                    # The allocation still stands; the requester just isn't emailed
+                    log.warning('allocation_email_failed', exc_info=True, extra={'blood_request_id': blood_request.id})
 
-            blood_request.save()
-            return JsonResponse({'success': True})
+            with transaction.atomic():
+                blood_request.save(update_fields=['assigned_donor_id'])
+                # Stamps allocated_at/fulfilled_at and feeds the SLA histograms
+                if status and not lifecycle.transition(blood_request, status, by=request.user) \
+                        and blood_request.status != status:
+                    transaction.set_rollback(True)
+                    return FastJsonResponse({'error': 'Request was changed by someone else'}, status=409)
+            return FastJsonResponse({'success': True})
         except BloodRequest.DoesNotExist:
-            return JsonResponse({'error': 'Request not found'}, status=404)
-        except Exception as e:
-            return JsonResponse({'error': 'Request failed'}, status=400)
+            return FastJsonResponse({'error': 'Request not found'}, status=404)
+        except Exception:
+            log.warning('request_failed', exc_info=True, extra={'view': type(self).__name__})
+            return FastJsonResponse({'error': 'Request failed'}, status=400)
 
 class GetInventoryView(View):
     def get(self, request):
-        inventory = Inventory.objects.all()
+        # Served from the shared-memory snapshot; no database round trip
         data = []
-        for item in inventory:
+        for blood_group, units in inventory_snapshot.units().items():
             data.append({
-                'blood_group': item.blood_group,
-                'units_available': float(item.units_available)
+                'blood_group': blood_group,
+                'units_available': units
             })
-        return JsonResponse(data, safe=False)
+        return FastJsonResponse(sparse(data, requested_fields(request)), safe=False)
+
+class AvailabilityView(View):
+    def get(self, request):
+        # Which centers can supply ?units= (default 1) of blood for a ?bloodGroup= recipient
+        blood_group = request.GET.get('bloodGroup')
+        if blood_group not in inventory.COMPATIBLE_DONORS:
+            return FastJsonResponse({'error': 'Unknown blood group'}, status=400)
+        try:
+            units = Decimal(request.GET.get('units') or 1)
+        except InvalidOperation:
+            return FastJsonResponse({'error': 'Invalid units'}, status=400)
+        if not units.is_finite() or units <= 0:
+            return FastJsonResponse({'error': 'Invalid units'}, status=400)
+        return FastJsonResponse(inventory.suppliers(blood_group, units), safe=False)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class IssueUnitsView(View):
+    def post(self, request):
+        if not request.user.is_staff:
+            return FastJsonResponse({'error': 'Unauthorized'}, status=401)
+        try:
+            data = json.loads(request.body)
+            units = Decimal(str(data['units']))
+            # Decimal accepts 'nan' and 'inf', which no stock check can compare against
+            if not units.is_finite() or units <= 0:
+                raise ValueError
+            issued = inventory.issue(data.get('center'), data['bloodGroup'], units)
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            return FastJsonResponse({'error': 'bloodGroup and a positive units are required'}, status=400)
+        if not issued:
+            return FastJsonResponse({'error': 'Not enough units at this center'}, status=409)
+        return FastJsonResponse({'success': True})
 
 @method_decorator(csrf_exempt, name='dispatch')
 class RequestBloodView(View):
     def post(self, request):
         try:
             data = json.loads(request.body)
+            # Flag, don't reject: staff decide whether a likely duplicate is really the same patient
+            dedupe_key = dedupe.blocking_key(
+                data.get('patientName'), data.get('hospital'), data.get('bloodGroup'), data.get('contactNumber')
+            )
+            original = dedupe.find_original(dedupe_key, timezone.now())
             blood_request = BloodRequest.objects.create(
                 patient_name=data.get('patientName'),
                 blood_group=data.get('bloodGroup'),
@@ -227,18 +427,27 @@ class RequestBloodView(View):
                 contact_number=data.get('contactNumber'),
                 requester_email=data.get('email'),
                 urgency=data.get('urgency'),
-                additional_notes=data.get('additionalNotes', '')
+                additional_notes=data.get('additionalNotes', ''),
+                dedupe_key=dedupe_key,
+                duplicate_of=original,
             )
-            return JsonResponse({'success': True, 'id': blood_request.id})
-        except Exception as e:
-            return JsonResponse({'error': 'Request failed'}, status=400)
+            # A resubmission only alerts donors if it escalates the original to critical
+            if blood_request.urgency == 'critical' and (original is None or original.urgency != 'critical'):
+                # Donor alerts go out from the background worker, never on the request thread
+                transaction.on_commit(lambda: broadcast_worker.enqueue(blood_request.id))
+            return FastJsonResponse({
+                'success': True, 'id': blood_request.id, 'duplicateOf': original.id if original else None,
+            })
+        except Exception:
+            log.warning('request_failed', exc_info=True, extra={'view': type(self).__name__})
+            return FastJsonResponse({'error': 'Request failed'}, status=400)
 
 
 
 @method_decorator(ensure_csrf_cookie, name='dispatch')
 class GetCSRFToken(View):
     def get(self, request):
-        return JsonResponse({'success': 'CSRF cookie set'})
+        return FastJsonResponse({'success': 'CSRF cookie set'})
 
 class LoginView(View):
     def post(self, request):
@@ -247,25 +456,19 @@ class LoginView(View):
             raw_username = data.get('email', '').strip()
             password = data.get('password')
             
-            print(f"--- LOGIN ATTEMPT ---")
-            print(f"Username provided: [{raw_username}]")
-            
             # 1. Try direct authenticate
             user = authenticate(username=raw_username, password=password)
-            print(f"Direct authenticate result: {user}")
+            via_email = False
             
             # 2. If fails and looks like email, try finding user by email first
             if user is None and '@' in raw_username:
-                print(f"Direct auth failed. Searching for user with email: {raw_username}")
                 user_obj = User.objects.filter(email=raw_username).first()
                 if user_obj:
-                    print(f"Found user object: {user_obj.username}. Attempting auth with this username.")
                     user = authenticate(username=user_obj.username, password=password)
-                    print(f"Email lookup authenticate result: {user}")
-            
-            print(f"Final Auth Result: {user}")
+                    via_email = user is not None
             
             if user is not None:
+                log.info('login', extra={'user_id': user.id, 'via_email': via_email})
                 login(request, user)
                 # Fetch profile data
                 profile_data = {}
@@ -277,10 +480,10 @@ class LoginView(View):
                         'phone': profile.phone,
                         'city': profile.city
                     }
-                except Exception as e:
-                    profile_data = {'isEligible': False} 
+                except DonorProfile.DoesNotExist:
+                    profile_data = {'isEligible': False}
                     
-                return JsonResponse({
+                return FastJsonResponse({
                     'user': {
                         'id': user.id, 
                         'email': user.username, 
@@ -289,9 +492,11 @@ class LoginView(View):
                     }
                 })
             
-            return JsonResponse({'error': 'Invalid credentials'}, status=400)
-        except Exception as e:
-            return JsonResponse({'error': 'Request failed'}, status=400)
+            log.info('login_failed')
+            return FastJsonResponse({'error': 'Invalid credentials'}, status=400)
+        except Exception:
+            log.warning('request_failed', exc_info=True, extra={'view': type(self).__name__})
+            return FastJsonResponse({'error': 'Request failed'}, status=400)
 
 class RegisterView(View):
     def post(self, request):
@@ -301,34 +506,37 @@ class RegisterView(View):
             password = data.get('password')
             
             if User.objects.filter(username=email).exists():
-                return JsonResponse({'error': 'Account already exists'}, status=400)
+                return FastJsonResponse({'error': 'Account already exists'}, status=400)
             
             user = User.objects.create_user(username=email, email=email, password=password)
             login(request, user)
             
             # Create Donor Profile
-            DonorProfile.objects.create(user=user, is_eligible=False)
+            DonorProfile.objects.create(user=user, is_eligible=False, registered_at=user.date_joined)
             
             login(request, user)
-            return JsonResponse({'user': {'id': user.id, 'email': user.username, 'role': 'donor', 'isEligible': False}})
-        except Exception as e:
-            return JsonResponse({'error': 'Request failed'}, status=400)
+            return FastJsonResponse({'user': {'id': user.id, 'email': user.username, 'role': 'donor', 'isEligible': False}})
+        except Exception:
+            log.warning('request_failed', exc_info=True, extra={'view': type(self).__name__})
+            return FastJsonResponse({'error': 'Request failed'}, status=400)
 
 class LogoutView(View):
     def post(self, request):
         logout(request)
-        return JsonResponse({'success': 'Logged out'})
+        return FastJsonResponse({'success': 'Logged out'})
 
 @method_decorator(csrf_exempt, name='dispatch')
 class UpdateEligibilityView(View):
     def post(self, request):
         if not request.user.is_authenticated:
-            return JsonResponse({'error': 'Unauthorized'}, status=401)
+            return FastJsonResponse({'error': 'Unauthorized'}, status=401)
             
         try:
             data = json.loads(request.body)
             # Find or create profile
-            profile, created = DonorProfile.objects.get_or_create(user=request.user)
+            profile, created = DonorProfile.objects.get_or_create(
+                user=request.user, defaults={'registered_at': request.user.date_joined}
+            )
             
             is_eligible = data.get('isEligible', False)
             profile.is_eligible = is_eligible
@@ -341,18 +549,42 @@ class UpdateEligibilityView(View):
             
             profile.save()
             
-            return JsonResponse({'success': True, 'isEligible': profile.is_eligible})
-        except Exception as e:
-            return JsonResponse({'error': 'Request failed'}, status=400)
+            return FastJsonResponse({'success': True, 'isEligible': profile.is_eligible})
+        except Exception:
+            log.warning('request_failed', exc_info=True, extra={'view': type(self).__name__})
+            return FastJsonResponse({'error': 'Request failed'}, status=400)
 
 class GetDonorsView(View):
     def get(self, request):
         # Admin check
-        # if not request.user.is_staff: return JsonResponse({'error': 'Forbidden'}, status=403)
+        # if not request.user.is_staff: return FastJsonResponse({'error': 'Forbidden'}, status=403)
+        
+        try:
+            # These raise ValueError with messages written for the client
+            donors = directory.filter_donors(DonorProfile.objects.all(), request.GET)
+            sort = directory.sort_key(request.GET)
+        except ValueError as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+        try:
+            limit = int(request.GET.get('limit') or 0)
+            offset = int(request.GET.get('offset') or 0)
+            after = directory.after_cursor(request.GET['cursor'], sort) if request.GET.get('cursor') else None
+        except ValueError:
+            return FastJsonResponse({'error': 'Invalid limit, offset or cursor'}, status=400)
+        
+        # ?limit= switches to pagination: {'results', 'next', 'total'}; ?cursor= is keyset, ?offset= is for page jumps
+        page = donors
+        if after is not None:
+            page = page.filter(after)
+        page = page.select_related('user').order_by(*directory.ORDERINGS[sort])
+        if limit:
+            limit = max(1, min(limit, 100))
+            offset = 0 if after is not None else max(0, offset)
+            page = page[offset:offset + limit + 1]
         
-        donors = DonorProfile.objects.all().select_related('user')
+        profiles = list(page)
         data = []
-        for d in donors:
+        for d in profiles:
             data.append({
                 'id': str(d.user.id),
                 'full_name': d.user.first_name or d.user.username,
@@ -361,9 +593,17 @@ class GetDonorsView(View):
                 'city': d.city,
                 'is_eligible': d.is_eligible,
                 'phone': d.phone,
-                'registered_at': d.registered_at.isoformat() if hasattr(d, 'registered_at') and d.registered_at else d.user.date_joined.isoformat()
+                'registered_at': d.registered_at.isoformat()
             })
-        return JsonResponse(data, safe=False)
+        if not limit:
+            return FastJsonResponse(sparse(data, requested_fields(request)), safe=False)
+        
+        rows, more = data[:limit], len(data) > limit
+        return FastJsonResponse({
+            'results': sparse(rows, requested_fields(request)),
+            'next': directory.cursor_for(profiles[limit - 1]) if more else None,
+            'total': directory.cached_count(donors, request.GET),
+        })
 
 class UserView(View):
     def get(self, request):
@@ -380,7 +620,7 @@ class UserView(View):
             except DonorProfile.DoesNotExist:
                  profile_data = {'isEligible': False}
 
-            return JsonResponse({
+            return FastJsonResponse({
                 'user': {
                     'id': request.user.id, 
                     'email': request.user.username, 
@@ -388,26 +628,35 @@ class UserView(View):
                     **profile_data
                 }
             })
-        return JsonResponse({'user': None})
+        return FastJsonResponse({'user': None})
+
+class SlaStatsView(View):
+    def get(self, request):
+        if not request.user.is_staff: # Admin only
+            return FastJsonResponse({'error': 'Unauthorized'}, status=401)
+        # Wait-time percentiles in seconds, grouped by ?by=urgency|city|blood_group (default: overall)
+        by = request.GET.get('by') or 'all'
+        try:
+            groups = lifecycle.sla(by)
+        except ValueError as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+        return FastJsonResponse({'by': by, 'groups': groups})
 
 class DashboardStatsView(View):
     def get(self, request):
         if not request.user.is_staff: # Admin only
-             return JsonResponse({'error': 'Unauthorized'}, status=401)
+             return FastJsonResponse({'error': 'Unauthorized'}, status=401)
         
         total_donors = DonorProfile.objects.count()
-        total_donations = Donation.objects.count()
+        total_donations = Donation.objects.count() + ArchivedDonation.objects.count()
+        
+        # Calculate total units from the inventory snapshot (already floats)
+        total_units = sum(inventory_snapshot.units().values())
         
-        # Calculate total units from Inventory
-        # Convert Decimal to float for JSON
-        total_units = 0
-        for item in Inventory.objects.all():
-            total_units += float(item.units_available)
-            
         # Eligible donors
         eligible_donors = DonorProfile.objects.filter(is_eligible=True).count()
         
-        return JsonResponse({
+        return FastJsonResponse({
             'totalDonors': total_donors,
             'totalDonations': total_donations,
             'totalUnits': total_units,
@@ -416,3 +665,97 @@ class DashboardStatsView(View):
             'thisMonthDonors': 0,
             'lastMonthDonors': 0
         })
+
+
+def slot_json(slot):
+    return {
+        'id': slot.id,
+        'center': slot.center,
+        'starts_at': slot.starts_at.isoformat(),
+        'capacity': slot.capacity,
+        'remaining': slot.capacity - slot.booked,
+    }
+
+
+class SlotsView(View):
+    def get(self, request):
+        # Open slots from ?from= (default now) up to ?to= (default two weeks later), optionally at one ?center=
+        try:
+            start = directory.parse_moment(request.GET['from']) if request.GET.get('from') else timezone.now()
+            end = directory.parse_moment(request.GET['to'], end_of_day=True) if request.GET.get('to') else start + timedelta(days=14)
+        except ValueError as e:
+            return FastJsonResponse({'error': str(e)}, status=400)
+        end = min(end, start + appointments.MAX_RANGE)
+        
+        slots = appointments.available_slots(start, end, request.GET.get('center'))
+        return FastJsonResponse(sparse([slot_json(s) for s in slots], requested_fields(request)), safe=False)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CreateSlotView(View):
+    def post(self, request):
+        if not request.user.is_staff:
+            return FastJsonResponse({'error': 'Unauthorized'}, status=401)
+        try:
+            data = json.loads(request.body)
+            center, starts_at, capacity = data['center'], directory.parse_moment(data['startsAt']), int(data['capacity'])
+        except (KeyError, TypeError, ValueError):
+            return FastJsonResponse({'error': 'center, startsAt and capacity are required'}, status=400)
+        if capacity < 1:
+            return FastJsonResponse({'error': 'capacity must be at least 1'}, status=400)
+        try:
+            with transaction.atomic():  # savepoint, so a clash doesn't poison an enclosing transaction
+                slot = DonationSlot.objects.create(center=center, starts_at=starts_at, capacity=capacity)
+        except IntegrityError:
+            # The capacity check constraint can't fail here, so this is the (center, starts_at) one
+            return FastJsonResponse({'error': 'A slot already exists at that time'}, status=409)
+        return FastJsonResponse(slot_json(slot))
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BookSlotView(View):
+    ERRORS = {
+        appointments.FULL: ('Slot is full', 409),
+        appointments.CLOSED: ('Slot has already started', 409),
+        appointments.ALREADY_BOOKED: ('You already have this slot', 409),
+        appointments.NOT_FOUND: ('Slot not found', 404),
+    }
+
+    def post(self, request):
+        if not request.user.is_authenticated:
+            return FastJsonResponse({'error': 'Unauthorized'}, status=401)
+        try:
+            slot_id = int(json.loads(request.body).get('slotId'))
+        except (AttributeError, TypeError, ValueError):  # AttributeError: the body isn't a JSON object
+            return FastJsonResponse({'error': 'slotId is required'}, status=400)
+        
+        outcome, appointment = appointments.book(request.user, slot_id)
+        if outcome != appointments.BOOKED:
+            message, status = self.ERRORS[outcome]
+            return FastJsonResponse({'error': message}, status=status)
+        return FastJsonResponse({'success': True, 'id': appointment.id})
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CancelAppointmentView(View):
+    def post(self, request):
+        if not request.user.is_authenticated:
+            return FastJsonResponse({'error': 'Unauthorized'}, status=401)
+        try:
+            appointment_id = int(json.loads(request.body).get('appointmentId'))
+        except (AttributeError, TypeError, ValueError):  # AttributeError: the body isn't a JSON object
+            return FastJsonResponse({'error': 'appointmentId is required'}, status=400)
+        
+        if not appointments.cancel(request.user, appointment_id):
+            return FastJsonResponse({'error': 'Appointment not found'}, status=404)
+        return FastJsonResponse({'success': True})
+
+class MyAppointmentsView(View):
+    def get(self, request):
+        if not request.user.is_authenticated:
+            return FastJsonResponse({'error': 'Unauthorized'}, status=401)
+        
+        upcoming = (
+            Appointment.objects.filter(donor=request.user, slot__starts_at__gte=timezone.now())
+            .select_related('slot').order_by('slot__starts_at')
+        )
+        return FastJsonResponse([
+            {'id': a.id, 'slot': slot_json(a.slot), 'booked_at': a.created_at.isoformat()} for a in upcoming
+        ], safe=False)